@@ -0,0 +1,64 @@
+"""Redis-backed cache for query embeddings used by semantic search."""
+
+from __future__ import annotations
+
+import unicodedata
+
+from langchain_core.embeddings import Embeddings
+
+from common.cache import EmbeddingCache
+from common.constants import EMBEDDING_MODEL_NAME, OPENAI_EMBEDDING_DIMENSION
+from config.settings import QUERY_EMBEDDING_CACHE_TTL_SECONDS
+
+query_embedding_cache = EmbeddingCache(
+    "query-embedding",
+    model_name=EMBEDDING_MODEL_NAME,
+    dimensions=OPENAI_EMBEDDING_DIMENSION,
+    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different strings share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from a shared Redis cache.
+
+    Texts are cached by their normalized form (see common.cache.EmbeddingCache for the key,
+    encoding and TTL). Redis failures fall back to calling the wrapped model.
+    """
+
+    def __init__(self, model: Embeddings, cache: EmbeddingCache = query_embedding_cache):
+        self._model = model
+        self._cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, calling the wrapped model only for cache misses."""
+        if not texts:
+            return []
+
+        normalized = [normalize_query(text) for text in texts]
+        cached = self._cache.read(normalized)
+        vectors = {key: vector for key, vector in zip(normalized, cached) if vector is not None}
+        hits = len(texts) - sum(vector is None for vector in cached)
+
+        # Identical texts within one call are embedded once
+        missing: dict[str, str] = {}
+        for key, text in zip(normalized, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        fresh: dict[str, list[float]] = {}
+        if missing:
+            embedded = self._model.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), embedded))
+            vectors.update(fresh)
+
+        self._cache.write(fresh, hits=hits, misses=len(texts) - hits)
+
+        return [vectors[key] for key in normalized]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
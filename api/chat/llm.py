@@ -6,19 +6,17 @@ from typing import Any
 from langchain.agents import create_agent
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from pydantic import SecretStr
 
+from common import clients
 from common.constants import (
-    EMBEDDING_MODEL_NAME,
     LLM_MAX_TOOL_CALLS,
     LLM_MODEL_NAME,
     LLM_TEMPERATURE,
-    OPENAI_EMBEDDING_DIMENSION,
     TITLE_MAX_TOKENS,
     TITLE_TEMPERATURE,
 )
-from config.settings import OPENAI_API_KEY
 
+from .embeddings import CachedEmbeddings
 from .prompts import build_title_messages
 from .tools import create_tools
 
@@ -44,27 +42,18 @@ def _coerce_message_content(content: Any) -> str:
 
 
 def get_chat_model(temperature: float = LLM_TEMPERATURE) -> ChatOpenAI:
-    """Get configured ChatOpenAI model instance."""
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not configured")
-
-    return ChatOpenAI(
-        model=LLM_MODEL_NAME,
-        temperature=temperature,
-        api_key=SecretStr(OPENAI_API_KEY),
-    )
+    """Get the process-wide ChatOpenAI model for the given temperature."""
+    return clients.get_chat_model(LLM_MODEL_NAME, temperature)
 
 
 def get_embeddings_model() -> OpenAIEmbeddings:
-    """Get configured OpenAI embeddings model instance."""
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not configured")
-
-    return OpenAIEmbeddings(
-        model=EMBEDDING_MODEL_NAME,
-        dimensions=OPENAI_EMBEDDING_DIMENSION,
-        api_key=SecretStr(OPENAI_API_KEY),
-    )
+    """Get the process-wide OpenAI embeddings model."""
+    return clients.get_embeddings_model()
+
+
+def get_query_embeddings_model() -> CachedEmbeddings:
+    """Get the embeddings model for search queries, backed by the shared query cache."""
+    return CachedEmbeddings(get_embeddings_model())
 
 
 def _fallback_title(content: str) -> str:
@@ -229,7 +218,7 @@ def run_chat_with_tools(
     """
     # Initialize models
     llm = get_chat_model(temperature=temperature)
-    embeddings = get_embeddings_model()
+    embeddings = get_query_embeddings_model()
 
     # Create tools with injected dependencies
     tools = create_tools(
@@ -72,6 +72,8 @@ def build_system_message(
         "Tool Usage:",
         "- You have access to the semantic_search tool which uses multi-query retrieval for better results.",
         "- When you need to search for information, call semantic_search with multiple query variations (2-4 queries) to improve retrieval quality.",
+        "- To compare or contrast several attached documents, pass per_document_k to semantic_search so every attached document contributes its best chunks in a single call.",
+        '- When looking for exact identifiers, part numbers, codes or names, call semantic_search with search_mode="hybrid" so keyword matches are ranked too.',
         "- You can call list_documents to see the user's available documents (id, title, type, source name) when you need awareness of the library before searching. This does not attach documents to the conversation.",
         "- You can call get_full_document to retrieve the complete text of a document. WARNING: Use sparingly as full documents consume significant context. Prefer semantic_search for most queries.",
         "- Use tools when you need document-based answers. If attachments exist, restrict searches to them. If there are no attachments, search across the user's full document library.",
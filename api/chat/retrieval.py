@@ -0,0 +1,561 @@
+"""Retrieval for semantic search over document chunks, in Postgres or from in-memory snapshots."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from pgvector import Vector
+
+from common.constants import (
+    DOC_STATUS_COMPLETED,
+    EMBEDDING_STORAGE_BINARY,
+    EMBEDDING_STORAGE_HALFVEC,
+    EMBEDDING_STORAGE_VECTOR,
+    HYBRID_RRF_K,
+    OPENAI_EMBEDDING_DIMENSION,
+    SEARCH_MODE_HYBRID,
+    SEARCH_MODE_VECTOR,
+    SEARCH_PLAN_ANN,
+    SEARCH_PLAN_EXACT,
+    SEARCH_PLAN_MEMORY,
+    TEXT_SEARCH_CONFIG,
+)
+from config.settings import (
+    BINARY_SEARCH_OVERSAMPLING,
+    CENTROID_ROUTING_DOCUMENTS,
+    EMBEDDING_SEARCH_STORAGE,
+    EMBEDDING_SNAPSHOT_MAX_CHUNKS,
+    EXACT_SEARCH_MAX_CHUNKS,
+    HNSW_EF_SEARCH,
+    HNSW_ITERATIVE_SCAN,
+)
+from document.models import Document
+from document.snapshots import EmbeddingSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Per-query ANN candidates, one fragment per EMBEDDING_SEARCH_STORAGE. Each yields (id, distance)
+# with the exact float32 cosine distance, nearest first. halfvec walks the half-precision index;
+# binary walks the Hamming index over binary_quantize(embedding) for top_k * oversampling
+# candidates and re-ranks them exactly against the full-precision column.
+# A relaxed_order iterative scan may emit rows slightly out of order, so the index scan is
+# fenced in a subquery (its LIMIT keeps it from being flattened) and re-sorted outside it;
+# "+ 0" stops the planner from assuming the subquery's ORDER BY already sorted it.
+VECTOR_CANDIDATES_SQL = """
+        SELECT ann.id, ann.distance
+        FROM (
+            SELECT c.id, c.embedding <=> q.embedding AS distance
+            FROM document_chunks c
+            WHERE c.is_searchable AND {scope_filter}
+            ORDER BY c.embedding <=> q.embedding
+            LIMIT %(top_k)s
+        ) ann
+        ORDER BY ann.distance + 0
+"""
+
+HALFVEC_CANDIDATES_SQL = """
+        SELECT ann.id, ann.distance
+        FROM (
+            SELECT c.id, c.embedding <=> q.embedding AS distance
+            FROM document_chunks c
+            WHERE c.is_searchable AND c.embedding_half IS NOT NULL AND {scope_filter}
+            ORDER BY c.embedding_half <=> q.embedding::halfvec({dimensions})
+            LIMIT %(top_k)s
+        ) ann
+        ORDER BY ann.distance + 0
+"""
+
+BINARY_CANDIDATES_SQL = """
+        SELECT cand.id, cand.embedding <=> q.embedding AS distance
+        FROM (
+            SELECT c.id, c.embedding
+            FROM document_chunks c
+            WHERE c.is_searchable AND c.embedding_bits IS NOT NULL AND {scope_filter}
+            ORDER BY c.embedding_bits <~> binary_quantize(q.embedding)::bit({dimensions})
+            LIMIT %(candidate_k)s
+        ) cand
+        ORDER BY cand.embedding <=> q.embedding
+        LIMIT %(top_k)s
+"""
+
+CANDIDATES_SQL = {
+    EMBEDDING_STORAGE_VECTOR: VECTOR_CANDIDATES_SQL,
+    EMBEDDING_STORAGE_HALFVEC: HALFVEC_CANDIDATES_SQL,
+    EMBEDDING_STORAGE_BINARY: BINARY_CANDIDATES_SQL,
+}
+
+# Library-wide searches can first pick the documents whose centroid is closest to any query and
+# rank chunks only inside them, so the vector scan scales with documents rather than chunks.
+# Full-text ranking still covers the whole library.
+ROUTED_DOCUMENTS_SQL = """,
+routed_documents AS (
+    SELECT d.id
+    FROM document d
+    WHERE d.owner_id = %(scope)s AND d.status = %(routed_status)s AND d.centroid IS NOT NULL
+    ORDER BY (SELECT MIN(d.centroid <=> q.embedding) FROM queries q), d.id
+    LIMIT %(route_documents)s
+)"""
+
+ROUTED_SCOPE_FILTER = (
+    "c.owner_id = %(scope)s AND c.document_id IN (SELECT id FROM routed_documents)"
+)
+
+# One LATERAL subquery per query vector keeps each ORDER BY <=> ... LIMIT index-friendly,
+# then hits are fused by averaging the similarity over the queries that returned them.
+# Only the columns the tool returns are projected; embeddings and full text stay in Postgres.
+# owner_id/is_searchable are denormalized onto chunks so the candidate scan never joins document.
+MULTI_QUERY_SEARCH_SQL = """
+WITH queries (query_index, embedding) AS (
+    VALUES {query_values}
+){routed_documents},
+hits AS (
+    SELECT q.query_index, hit.id, 1 - hit.distance AS similarity
+    FROM {query_source}
+    CROSS JOIN LATERAL ({vector_candidates}) hit
+)
+SELECT
+    c.id,
+    c.document_id,
+    d.title,
+    LEFT(c.text, %(snippet_length)s) AS snippet,
+    c."order" AS chunk_order,
+    AVG(h.similarity) AS similarity,
+    AVG(h.similarity) AS score
+FROM hits h
+JOIN document_chunks c ON c.id = h.id
+JOIN document d ON d.id = c.document_id
+GROUP BY c.id, d.id
+ORDER BY similarity DESC, c.id
+"""
+
+# The exact expression of the document_chunk_search_gin index, so the planner can use it
+CHUNK_TSVECTOR_SQL = f"to_tsvector('{TEXT_SEARCH_CONFIG}', c.text)"
+
+# Full-text ranking of every query over CHUNK_TSVECTOR_SQL (GIN), as (query_index, id, rank)
+LEXICAL_HITS_SQL = """
+    SELECT
+        q.query_index,
+        hit.id,
+        ROW_NUMBER() OVER (
+            PARTITION BY {rank_partition} ORDER BY hit.lexical_rank DESC, hit.id
+        ) AS rank
+    FROM {query_source}
+    CROSS JOIN LATERAL (
+        SELECT c.id, ts_rank({tsvector}, q.tsquery, 1) AS lexical_rank
+        FROM document_chunks c
+        WHERE c.is_searchable AND {scope_filter} AND {tsvector} @@ q.tsquery
+        ORDER BY lexical_rank DESC
+        LIMIT %(top_k)s
+    ) hit
+"""
+
+# Hybrid mode ranks every query twice, by vector distance (HNSW) and by ts_rank, then fuses
+# all ranked lists with reciprocal rank fusion: score = sum(1 / (rrf_k + rank)). The reported similarity is the mean cosine similarity
+# across all query vectors, so lexical-only hits still carry a comparable score.
+HYBRID_SEARCH_SQL = """
+WITH queries (query_index, embedding, tsquery) AS (
+    VALUES {query_values}
+){routed_documents},
+vector_hits AS (
+    SELECT
+        q.query_index,
+        hit.id,
+        ROW_NUMBER() OVER (PARTITION BY {rank_partition} ORDER BY hit.distance, hit.id) AS rank
+    FROM {query_source}
+    CROSS JOIN LATERAL ({vector_candidates}) hit
+),
+lexical_hits AS ({lexical_hits}),
+fused AS (
+    SELECT ranked.id, SUM(1.0 / (%(rrf_k)s + ranked.rank)) AS rrf_score
+    FROM (
+        SELECT id, rank FROM vector_hits
+        UNION ALL
+        SELECT id, rank FROM lexical_hits
+    ) ranked
+    GROUP BY ranked.id
+)
+SELECT
+    c.id,
+    c.document_id,
+    d.title,
+    LEFT(c.text, %(snippet_length)s) AS snippet,
+    c."order" AS chunk_order,
+    (SELECT AVG(1 - (c.embedding <=> q.embedding)) FROM queries q) AS similarity,
+    f.rrf_score AS score
+FROM fused f
+JOIN document_chunks c ON c.id = f.id
+JOIN document d ON d.id = c.document_id
+ORDER BY f.rrf_score DESC, c.id
+"""
+
+# Per-document balancing ranks candidates for every (query, document) pair, then keeps the
+# best per_document_k fused hits of each document, so one document cannot crowd out the rest.
+PER_DOCUMENT_QUERY_SOURCE = "queries q CROSS JOIN unnest(%(scope)s::uuid[]) AS scope_document(id)"
+PER_DOCUMENT_SCOPE_FILTER = "c.document_id = scope_document.id"
+
+PER_DOCUMENT_SEARCH_SQL = """
+SELECT id, document_id, title, snippet, chunk_order, similarity, score
+FROM (
+    SELECT
+        ranked.*,
+        ROW_NUMBER() OVER (
+            PARTITION BY ranked.document_id ORDER BY ranked.score DESC, ranked.id
+        ) AS document_rank
+    FROM ({search}) ranked
+) balanced
+WHERE document_rank <= %(top_k)s
+ORDER BY score DESC, id
+"""
+
+
+# In-memory (snapshot) search ranks vectors in the process and only visits Postgres to hydrate
+# the winners. In hybrid mode the same round trip runs the lexical ranking and returns each
+# chunk's lexical RRF contribution; the vector contribution is added in Python.
+SNAPSHOT_CHUNKS_SQL = """
+SELECT c.id, c.document_id, d.title, LEFT(c.text, %(snippet_length)s), c."order", 0
+FROM document_chunks c
+JOIN document d ON d.id = c.document_id
+WHERE c.id = ANY(%(chunk_ids)s::uuid[]) AND c.is_searchable
+"""
+
+SNAPSHOT_HYBRID_CHUNKS_SQL = """
+WITH queries (query_index, tsquery) AS (
+    VALUES {query_values}
+),
+lexical_hits AS ({lexical_hits}),
+lexical_scores AS (
+    SELECT id, SUM(1.0 / (%(rrf_k)s + rank)) AS rrf_score
+    FROM lexical_hits
+    GROUP BY id
+),
+candidates AS (
+    SELECT id FROM lexical_scores
+    UNION
+    SELECT unnest(%(chunk_ids)s::uuid[])
+)
+SELECT
+    c.id,
+    c.document_id,
+    d.title,
+    LEFT(c.text, %(snippet_length)s),
+    c."order",
+    COALESCE(l.rrf_score, 0)
+FROM candidates k
+JOIN document_chunks c ON c.id = k.id
+JOIN document d ON d.id = c.document_id
+LEFT JOIN lexical_scores l ON l.id = c.id
+WHERE c.is_searchable
+"""
+
+
+def _configure_vector_search(candidate_k: int, *, exact: bool = False) -> None:
+    """Apply HNSW tuning to the current transaction.
+
+    ef_search is raised to at least candidate_k so the index can return enough candidates, and
+    the iterative scan keeps the index walking when owner/status filters reject candidates.
+    Exact searches disable plain index scans instead, so distances are computed for every
+    candidate (btree bitmap scans still narrow the candidates by owner/document).
+    """
+    if exact:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('enable_indexscan', 'off', true)")
+        return
+
+    ef_search = max(HNSW_EF_SEARCH, candidate_k)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('hnsw.ef_search', %s, true), "
+            "set_config('hnsw.iterative_scan', %s, true)",
+            [str(ef_search), HNSW_ITERATIVE_SCAN],
+        )
+
+
+def _scope(document_ids: Optional[Sequence[str]], owner_id: Any) -> tuple[str, Any]:
+    """Return the chunk filter and its %(scope)s parameter."""
+    if document_ids:
+        return "c.document_id = ANY(%(scope)s::uuid[])", [
+            str(document_id) for document_id in document_ids
+        ]
+    if owner_id is not None:
+        return "c.owner_id = %(scope)s", owner_id
+    raise ValueError("Either document_ids or owner_id is required")
+
+
+def _ranking_fragment_args(per_document: bool) -> dict[str, str]:
+    """Return what each ranked list is computed over: queries, or (query, document) pairs."""
+    if per_document:
+        return {
+            "query_source": PER_DOCUMENT_QUERY_SOURCE,
+            "rank_partition": "q.query_index, scope_document.id",
+        }
+    return {"query_source": "queries q", "rank_partition": "q.query_index"}
+
+
+def search_chunks(
+    embeddings: Sequence[Sequence[float]],
+    *,
+    top_k: int,
+    snippet_length: int,
+    document_ids: Optional[Sequence[str]] = None,
+    owner_id: Any = None,
+    queries: Optional[Sequence[str]] = None,
+    mode: str = SEARCH_MODE_VECTOR,
+    storage: str = EMBEDDING_SEARCH_STORAGE,
+    route_documents: int = CENTROID_ROUTING_DOCUMENTS,
+    per_document_k: Optional[int] = None,
+    exact: bool = False,
+) -> list[dict[str, Any]]:
+    """Run a multi-query chunk search in a single statement.
+
+    Args:
+        embeddings: Query embeddings, one per query variation.
+        top_k: Number of chunks to fetch per query (and per ranking in hybrid mode).
+        snippet_length: Characters of chunk text to return. One extra character is fetched
+            so callers can tell whether the text was cut.
+        document_ids: Restrict the search to these documents.
+        owner_id: Search all completed documents of this user when no document_ids are given.
+        queries: Query texts matching embeddings; required for hybrid mode.
+        mode: SEARCH_MODE_VECTOR or SEARCH_MODE_HYBRID.
+        storage: Embedding column the ANN pass reads (EMBEDDING_STORAGE_*). Quantized storages
+            only see chunks whose shadow column has been populated.
+        route_documents: For library-wide (owner_id) searches, rank vectors only inside this
+            many documents with the closest centroids; 0 ranks every chunk.
+        per_document_k: With document_ids, return up to this many hits per document instead
+            of a global top_k, ranking every (query, document) pair separately.
+        exact: Scan every candidate on the float32 column instead of walking an ANN index;
+            storage and routing are ignored.
+
+    Returns:
+        Fused hits sorted best first.
+    """
+    if not embeddings:
+        return []
+
+    if storage not in CANDIDATES_SQL:
+        raise ValueError(f"Unsupported embedding storage: {storage}")
+    if exact:
+        storage = EMBEDDING_STORAGE_VECTOR
+        route_documents = 0
+
+    scope_filter, scope_param = _scope(document_ids, owner_id)
+    per_document = bool(document_ids and per_document_k)
+    if per_document:
+        top_k = int(per_document_k or 0)
+        scope_filter = PER_DOCUMENT_SCOPE_FILTER
+
+    params: dict[str, Any] = {
+        "scope": scope_param,
+        "top_k": top_k,
+        "snippet_length": snippet_length + 1,
+    }
+    candidate_k = top_k
+    if storage == EMBEDDING_STORAGE_BINARY:
+        candidate_k = top_k * max(1, BINARY_SEARCH_OVERSAMPLING)
+        params["candidate_k"] = candidate_k
+    for index, embedding in enumerate(embeddings):
+        params[f"embedding_{index}"] = Vector(list(embedding)).to_text()
+
+    if mode == SEARCH_MODE_HYBRID:
+        if queries is None or len(queries) != len(embeddings):
+            raise ValueError("Hybrid search needs one query text per embedding")
+        for index, query in enumerate(queries):
+            params[f"query_{index}"] = query
+        params["rrf_k"] = HYBRID_RRF_K
+        query_values = ", ".join(
+            f"({index}, %(embedding_{index})s::vector, "
+            f"websearch_to_tsquery('{TEXT_SEARCH_CONFIG}', %(query_{index})s))"
+            for index in range(len(embeddings))
+        )
+        template = HYBRID_SEARCH_SQL
+    elif mode == SEARCH_MODE_VECTOR:
+        query_values = ", ".join(
+            f"({index}, %(embedding_{index})s::vector)" for index in range(len(embeddings))
+        )
+        template = MULTI_QUERY_SEARCH_SQL
+    else:
+        raise ValueError(f"Unsupported search mode: {mode}")
+
+    routed_documents = ""
+    vector_scope_filter = scope_filter
+    if not document_ids and route_documents > 0:
+        routed_documents = ROUTED_DOCUMENTS_SQL
+        vector_scope_filter = ROUTED_SCOPE_FILTER
+        params["route_documents"] = route_documents
+        params["routed_status"] = DOC_STATUS_COMPLETED
+
+    vector_candidates = CANDIDATES_SQL[storage].format(
+        scope_filter=vector_scope_filter, dimensions=OPENAI_EMBEDDING_DIMENSION
+    )
+    fragment_args = _ranking_fragment_args(per_document)
+    sql = template.format(
+        query_values=query_values,
+        routed_documents=routed_documents,
+        vector_candidates=vector_candidates,
+        lexical_hits=LEXICAL_HITS_SQL.format(
+            tsvector=CHUNK_TSVECTOR_SQL, scope_filter=scope_filter, **fragment_args
+        ),
+        **fragment_args,
+    )
+    if per_document:
+        sql = PER_DOCUMENT_SEARCH_SQL.format(search=sql)
+
+    with transaction.atomic():
+        _configure_vector_search(candidate_k, exact=exact)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+    return [
+        _hit(chunk_id, document_id, title, snippet, order, similarity)
+        for chunk_id, document_id, title, snippet, order, similarity, _ in rows
+    ]
+
+
+def plan_search(
+    *, owner_id: Any, document_ids: Optional[Sequence[str]] = None, allow_memory: bool = True
+) -> tuple[str, int]:
+    """Pick the cheapest retrieval plan for a search from cached per-document chunk counts.
+
+    Small candidate sets (e.g. one attached document) are scanned exactly in Postgres, libraries
+    that fit a snapshot are ranked in memory, and everything else walks the ANN index.
+
+    Returns:
+        The SEARCH_PLAN_* constant and the estimated number of candidate chunks.
+    """
+    documents = Document.objects.filter(owner_id=owner_id, status=DOC_STATUS_COMPLETED)
+    aggregates = {"library": Sum("chunk_count")}
+    if document_ids:
+        aggregates["attached"] = Sum("chunk_count", filter=Q(id__in=list(document_ids)))
+    totals = documents.aggregate(**aggregates)
+    library_chunks = totals["library"] or 0
+    candidates = (totals["attached"] or 0) if document_ids else library_chunks
+
+    if candidates <= EXACT_SEARCH_MAX_CHUNKS:
+        return SEARCH_PLAN_EXACT, candidates
+    if allow_memory and 0 < library_chunks <= EMBEDDING_SNAPSHOT_MAX_CHUNKS:
+        return SEARCH_PLAN_MEMORY, candidates
+    return SEARCH_PLAN_ANN, candidates
+
+
+def _hit(chunk_id, document_id, title, snippet, order, similarity) -> dict[str, Any]:
+    return {
+        "chunk_id": str(chunk_id),
+        "document_id": str(document_id),
+        "document_title": title,
+        "snippet": snippet,
+        "chunk_order": order,
+        "similarity": float(similarity),
+    }
+
+
+def search_snapshot(
+    snapshot: EmbeddingSnapshot,
+    embeddings: Sequence[Sequence[float]],
+    *,
+    top_k: int,
+    snippet_length: int,
+    document_ids: Optional[Sequence[str]] = None,
+    queries: Optional[Sequence[str]] = None,
+    mode: str = SEARCH_MODE_VECTOR,
+) -> list[dict[str, Any]]:
+    """Exact search over a memory-mapped snapshot of the owner's chunks.
+
+    Takes the same arguments and returns the same hits as search_chunks, but ranks vectors with
+    a NumPy matrix product instead of an index walk, so results are exact.
+    """
+    if not embeddings:
+        return []
+    if mode not in (SEARCH_MODE_VECTOR, SEARCH_MODE_HYBRID):
+        raise ValueError(f"Unsupported search mode: {mode}")
+
+    query_matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+    query_matrix /= np.where(norms == 0, 1, norms)
+
+    if document_ids:
+        wanted = {str(document_id) for document_id in document_ids}
+        allowed = [
+            i for i, document_id in enumerate(snapshot.document_ids) if document_id in wanted
+        ]
+        rows = np.flatnonzero(np.isin(snapshot.document_index, allowed))
+        similarities = snapshot.embeddings[rows] @ query_matrix.T
+    else:
+        rows = np.arange(len(snapshot.chunk_ids))
+        similarities = snapshot.embeddings @ query_matrix.T
+
+    # Per-query top_k, best first; ties broken by chunk id like the SQL path
+    ranked_rows: list[np.ndarray] = []
+    limit = min(top_k, len(rows))
+    for column in similarities.T:
+        if limit == 0:
+            ranked_rows.append(rows[:0])
+            continue
+        best = np.argpartition(-column, limit - 1)[:limit]
+        order = np.lexsort((snapshot.chunk_ids[rows[best]], -column[best]))
+        ranked_rows.append(best[order])
+
+    params: dict[str, Any] = {"snippet_length": snippet_length + 1}
+    scores: dict[str, float] = {}
+    if mode == SEARCH_MODE_HYBRID:
+        if queries is None or len(queries) != len(embeddings):
+            raise ValueError("Hybrid search needs one query text per embedding")
+        for ranked in ranked_rows:
+            for rank, position in enumerate(ranked, start=1):
+                chunk_id = str(snapshot.chunk_ids[rows[position]])
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (HYBRID_RRF_K + rank)
+
+        scope_filter, params["scope"] = _scope(document_ids, snapshot.owner_id)
+        for index, query in enumerate(queries):
+            params[f"query_{index}"] = query
+        params.update(top_k=top_k, rrf_k=HYBRID_RRF_K)
+        query_values = ", ".join(
+            f"({index}, websearch_to_tsquery('{TEXT_SEARCH_CONFIG}', %(query_{index})s))"
+            for index in range(len(queries))
+        )
+        sql = SNAPSHOT_HYBRID_CHUNKS_SQL.format(
+            query_values=query_values,
+            lexical_hits=LEXICAL_HITS_SQL.format(
+                tsvector=CHUNK_TSVECTOR_SQL,
+                scope_filter=scope_filter,
+                **_ranking_fragment_args(per_document=False),
+            ),
+        )
+    else:
+        hit_similarities: dict[str, list[float]] = {}
+        for column, ranked in zip(similarities.T, ranked_rows):
+            for position in ranked:
+                chunk_id = str(snapshot.chunk_ids[rows[position]])
+                hit_similarities.setdefault(chunk_id, []).append(float(column[position]))
+        scores = {
+            chunk_id: sum(values) / len(values) for chunk_id, values in hit_similarities.items()
+        }
+        sql = SNAPSHOT_CHUNKS_SQL
+
+    params["chunk_ids"] = list(scores)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows_by_id = {str(row[0]): row for row in cursor.fetchall()}
+
+    hits = []
+    for chunk_id, (_, document_id, title, snippet, order, lexical_score) in rows_by_id.items():
+        snapshot_row = snapshot.row_by_chunk_id.get(chunk_id)
+        if snapshot_row is None:
+            # Chunk changed after the snapshot was validated
+            continue
+        if mode == SEARCH_MODE_HYBRID:
+            similarity = float(np.mean(query_matrix @ snapshot.embeddings[snapshot_row]))
+            score = scores.get(chunk_id, 0.0) + float(lexical_score)
+        else:
+            similarity = score = scores[chunk_id]
+        hits.append((
+            score,
+            chunk_id,
+            _hit(chunk_id, document_id, title, snippet, order, similarity),
+        ))
+
+    hits.sort(key=lambda item: (-item[0], item[1]))
+    return [hit for _, _, hit in hits]
@@ -1,21 +1,33 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any, Optional
 
-from django.db.models import Value
 from langchain.tools import tool
 from langchain_core.embeddings import Embeddings
-from pgvector.django import CosineDistance
 
-from common.constants import DOC_STATUS_COMPLETED, MAX_FULL_DOCUMENT_CHARS, WARN_FULL_DOCUMENT_CHARS
-from document.models import Document, DocumentChunk
+from common.constants import (
+    DOC_STATUS_COMPLETED,
+    MAX_FULL_DOCUMENT_CHARS,
+    SEARCH_MODE_HYBRID,
+    SEARCH_MODE_VECTOR,
+    SEARCH_PLAN_ANN,
+    SEARCH_PLAN_EXACT,
+    SEARCH_PLAN_MEMORY,
+    WARN_FULL_DOCUMENT_CHARS,
+)
+from document.models import Document
+from document.snapshots import load_snapshot
+
+from .retrieval import plan_search, search_chunks, search_snapshot
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_TOP_K = 5
 CHUNK_SNIPPET_LENGTH = 500
 MAX_QUERY_VARIATIONS = 4
+MAX_PER_DOCUMENT_K = 5
 
 
 def truncate_chunk_text(text: str, limit: int = CHUNK_SNIPPET_LENGTH) -> str:
@@ -33,8 +45,15 @@ def _execute_semantic_search(
     user,
     allow_all_when_no_attachment: bool = True,
     top_k: int = DEFAULT_TOP_K,
+    search_mode: str = SEARCH_MODE_VECTOR,
+    per_document_k: Optional[int] = None,
 ) -> tuple[dict[str, Any], set[str], set[str]]:
-    """Internal function to execute semantic search."""
+    """Internal function to execute semantic search.
+
+    Hybrid mode fuses vector and full-text rankings so exact identifiers and names are found
+    even when their embeddings are not close to the query. per_document_k returns
+    the best chunks of every attached document instead of a global top_k.
+    """
     if not attached_document_ids:
         if not allow_all_when_no_attachment:
             return (
@@ -67,59 +86,65 @@ def _execute_semantic_search(
     # Generate embeddings using LangChain Embeddings
     embeddings = embeddings_model.embed_documents(queries)
 
-    combined_results: dict[str, dict[str, Any]] = {}
-    document_ids_used: set[str] = set()
-
     top_k = max(1, min(int(top_k or DEFAULT_TOP_K), 20))
-
+    if per_document_k and attached_document_ids:
+        per_document_k = max(1, min(int(per_document_k), MAX_PER_DOCUMENT_K))
+    else:
+        per_document_k = None
+
+    search_kwargs: dict[str, Any] = {
+        "top_k": top_k,
+        "snippet_length": CHUNK_SNIPPET_LENGTH,
+        "queries": queries,
+        "mode": search_mode,
+    }
     if attached_document_ids:
-        base_queryset = DocumentChunk.objects.filter(
-            document_id__in=attached_document_ids,
-            document__status=DOC_STATUS_COMPLETED,
-        ).select_related("document")
+        search_kwargs["document_ids"] = attached_document_ids
         search_scope = "attached_documents"
     else:
-        base_queryset = (
-            DocumentChunk.objects
-            .filter(
-                document__owner=user,
-                document__status=DOC_STATUS_COMPLETED,
-            )
-            .select_related("document")
-            .all()
-        )
         search_scope = "all_user_documents"
 
-    for embedding in embeddings:
-        chunks = base_queryset.annotate(
-            similarity=Value(1.0) - CosineDistance("embedding", embedding)
-        ).order_by("-similarity")[:top_k]
-
-        for chunk in chunks:
-            chunk_id_str = str(chunk.id)
-            if chunk_id_str not in combined_results:
-                combined_results[chunk_id_str] = {
-                    "chunk_id": chunk_id_str,
-                    "document_id": str(chunk.document.id),
-                    "document_title": chunk.document.title,
-                    "chunk_text": truncate_chunk_text(chunk.text),
-                    "chunk_order": chunk.order,
-                    "scores": [],
-                }
-            combined_results[chunk_id_str]["scores"].append(
-                float(getattr(chunk, "similarity", 0.0))
-            )
-            document_ids_used.add(str(chunk.document.id))
-
-    ranked_chunks: list[dict[str, Any]] = []
-    for entry in combined_results.values():
-        scores = entry.pop("scores", [])
-        average_score = sum(scores) / len(scores) if scores else 0.0
-        entry["similarity_score"] = round(average_score, 6)
-        ranked_chunks.append(entry)
+    # Per-document balancing always runs as one window-function query in Postgres
+    started = time.perf_counter()
+    plan, estimated_chunks = plan_search(
+        owner_id=user.pk,
+        document_ids=attached_document_ids,
+        allow_memory=per_document_k is None,
+    )
+    snapshot = load_snapshot(user.pk) if plan == SEARCH_PLAN_MEMORY else None
+    if snapshot is not None:
+        hits = search_snapshot(snapshot, embeddings, **search_kwargs)
+    else:
+        if plan == SEARCH_PLAN_MEMORY:
+            plan = SEARCH_PLAN_ANN
+        hits = search_chunks(
+            embeddings,
+            owner_id=user.pk,
+            per_document_k=per_document_k,
+            exact=plan == SEARCH_PLAN_EXACT,
+            **search_kwargs,
+        )
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(
+        "semantic_search plan=%s estimated_chunks=%s latency_ms=%s",
+        plan,
+        estimated_chunks,
+        latency_ms,
+    )
 
-    ranked_chunks.sort(key=lambda item: item["similarity_score"], reverse=True)
-    selected_chunks = ranked_chunks[:top_k]
+    # Hits arrive fused and ranked; document_ids_used covers every ranking's top_k
+    document_ids_used: set[str] = {hit["document_id"] for hit in hits}
+    selected_chunks = [
+        {
+            "chunk_id": hit["chunk_id"],
+            "document_id": hit["document_id"],
+            "document_title": hit["document_title"],
+            "chunk_text": truncate_chunk_text(hit["snippet"]),
+            "chunk_order": hit["chunk_order"],
+            "similarity_score": round(hit["similarity"], 6),
+        }
+        for hit in (hits if per_document_k else hits[:top_k])
+    ]
 
     return (
         {
@@ -129,6 +154,13 @@ def _execute_semantic_search(
             if attached_document_ids
             else sorted(document_ids_used),
             "search_scope": search_scope,
+            "search_mode": search_mode,
+            "per_document_k": per_document_k,
+            "retrieval": {
+                "plan": plan,
+                "estimated_chunks": estimated_chunks,
+                "latency_ms": latency_ms,
+            },
         },
         {chunk["chunk_id"] for chunk in selected_chunks},
         document_ids_used,
@@ -142,6 +174,8 @@ def create_tools(embeddings_model: Embeddings, user, attached_document_ids: list
     def semantic_search(
         queries: list[str],
         top_k: int = DEFAULT_TOP_K,
+        per_document_k: Optional[int] = None,
+        search_mode: str = SEARCH_MODE_VECTOR,
     ) -> dict[str, Any]:
         """Search for relevant content in attached documents using semantic similarity.
 
@@ -150,6 +184,10 @@ def create_tools(embeddings_model: Embeddings, user, attached_document_ids: list
         Args:
             queries: Multiple query variations to search for (2-4 queries recommended for better retrieval)
             top_k: Number of top results to return per query (default: 5)
+            per_document_k: When several documents are attached, return this many top results from
+                each attached document instead of a global top_k (1-5). Use it to compare documents.
+            search_mode: "vector" (default) or "hybrid". Hybrid also ranks exact keyword matches;
+                use it for identifiers, part numbers, codes and names.
 
         Returns:
             Dictionary containing search results with chunks, document IDs, and search scope.
@@ -160,6 +198,8 @@ def create_tools(embeddings_model: Embeddings, user, attached_document_ids: list
             attached_document_ids=attached_document_ids,
             user=user,
             top_k=top_k,
+            per_document_k=per_document_k,
+            search_mode=search_mode if search_mode == SEARCH_MODE_HYBRID else SEARCH_MODE_VECTOR,
         )
         return result
 
@@ -179,7 +219,12 @@ def create_tools(embeddings_model: Embeddings, user, attached_document_ids: list
         """
         limit = max(1, min(int(limit or 20), 50))
 
-        qs = Document.objects.filter(owner=user).order_by("-created_at")
+        qs = (
+            Document.objects
+            .filter(owner=user)
+            .only("id", "title", "document_type", "status", "source_name", "created_at")
+            .order_by("-created_at")
+        )
         if status:
             qs = qs.filter(status=status)
 
@@ -226,7 +271,7 @@ def create_tools(embeddings_model: Embeddings, user, attached_document_ids: list
                     owner=user,
                     status=DOC_STATUS_COMPLETED,
                 )
-                .prefetch_related("chunks")
+                .only("id", "title", "document_type", "summary")
                 .first()
             )
 
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import redis
+
+from config.settings import CACHE_REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_redis_client() -> redis.Redis:
+    """Return the process-wide client of the cache Redis (never the Celery one)."""
+    return redis.Redis.from_url(
+        CACHE_REDIS_URL,
+        socket_connect_timeout=1,
+        socket_timeout=1,
+    )
+
+
+class EmbeddingCache:
+    """Redis cache of embeddings keyed by the SHA-256 of their text.
+
+    Keys are namespaced by prefix, embedding model and dimensions, so a model change never
+    serves stale vectors. Entries are float32 bytes; reads refresh the TTL, so they expire on a
+    sliding window and the cache Redis evicts the least recently used first. Hit/miss counters
+    live under the prefix. Redis failures count as misses, and a TTL of 0 disables the cache.
+    """
+
+    def __init__(self, prefix: str, *, model_name: str, dimensions: int, ttl_seconds: int):
+        self.prefix = prefix
+        self._namespace = f"{prefix}:{model_name}:{dimensions}"
+        self._ttl_seconds = ttl_seconds
+        self._hits_key = f"{prefix}:stats:hits"
+        self._misses_key = f"{prefix}:stats:misses"
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self._namespace}:{digest}"
+
+    def read(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Return the cached embedding of each text, or None where it is not cached."""
+        if not texts or self._ttl_seconds <= 0:
+            return [None] * len(texts)
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            for text in texts:
+                pipeline.getex(self._key(text), ex=self._ttl_seconds)
+            payloads = pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning("Embedding cache %s read failed: %s", self.prefix, e)
+            return [None] * len(texts)
+        return [
+            np.frombuffer(payload, dtype=np.float32).tolist() if payload is not None else None
+            for payload in payloads
+        ]
+
+    def write(self, embeddings: dict[str, list[float]], *, hits: int = 0, misses: int = 0) -> None:
+        """Cache freshly computed embeddings keyed by their text and record hit/miss counts."""
+        if self._ttl_seconds <= 0:
+            return
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            for text, embedding in embeddings.items():
+                payload = np.asarray(embedding, dtype=np.float32).tobytes()
+                pipeline.set(self._key(text), payload, ex=self._ttl_seconds)
+            if hits:
+                pipeline.incrby(self._hits_key, hits)
+            if misses:
+                pipeline.incrby(self._misses_key, misses)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning("Embedding cache %s write failed: %s", self.prefix, e)
+
+    def stats(self) -> dict[str, int]:
+        """Return cumulative hit/miss counters."""
+        try:
+            hits, misses = get_redis_client().mget([self._hits_key, self._misses_key])
+        except redis.RedisError as e:
+            logger.warning("Embedding cache %s stats unavailable: %s", self.prefix, e)
+            return {"hits": 0, "misses": 0}
+        return {"hits": int(hits or 0), "misses": int(misses or 0)}
@@ -0,0 +1,142 @@
+"""Process-wide S3 and OpenAI clients shared by API requests and Celery tasks.
+
+Clients are created lazily, once per process, and keep their HTTP connections alive between
+calls, so requests skip credential/endpoint resolution and TLS handshakes. Forked children
+(Celery prefork workers) drop the inherited registry and build their own clients instead of
+sharing sockets with the parent.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable, Hashable, TypeVar
+
+import boto3
+import httpx
+from botocore.config import Config
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from mypy_boto3_s3.client import S3Client
+from pydantic import SecretStr
+
+from common.constants import EMBEDDING_MODEL_NAME, OPENAI_EMBEDDING_DIMENSION
+from config.settings import (
+    AWS_ACCESS_KEY_ID,
+    AWS_S3_REGION,
+    AWS_SECRET_ACCESS_KEY,
+    OPENAI_API_KEY,
+    OPENAI_MAX_CONNECTIONS,
+    S3_MAX_POOL_CONNECTIONS,
+)
+
+T = TypeVar("T")
+
+# Reentrant: factories may fetch other clients (e.g. the shared HTTP pool)
+_lock = threading.RLock()
+_clients: dict[Hashable, Any] = {}
+
+
+def get_client(key: Hashable, factory: Callable[[], T]) -> T:
+    """Return the process-wide client registered under key, creating it on first use."""
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def reset_clients() -> None:
+    """Forget every client so the next call builds fresh ones.
+
+    Inherited clients are dropped rather than closed: closing them would shut down
+    connections that still belong to the parent process.
+    """
+    global _lock
+    _lock = threading.RLock()  # another thread may have held the lock at fork time
+    _clients.clear()
+
+
+os.register_at_fork(after_in_child=reset_clients)
+
+
+def get_s3_client() -> S3Client:
+    """Return the shared S3 client (boto3 clients are thread-safe)."""
+
+    def create() -> S3Client:
+        return boto3.session.Session().client(
+            "s3",
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+            region_name=AWS_S3_REGION,
+            config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+        )
+
+    return get_client("s3", create)
+
+
+def get_openai_http_client() -> httpx.Client:
+    """Return the keep-alive HTTP connection pool shared by all OpenAI clients."""
+
+    def create() -> httpx.Client:
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(600.0, connect=5.0),
+        )
+
+    return get_client("openai-http", create)
+
+
+def _require_openai_api_key() -> str:
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY is not configured")
+    return OPENAI_API_KEY
+
+
+def get_chat_model(model: str, temperature: float) -> ChatOpenAI:
+    """Return the shared ChatOpenAI client for a model and temperature."""
+    api_key = _require_openai_api_key()
+    return get_client(
+        ("chat", model, temperature),
+        lambda: ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            api_key=SecretStr(api_key),
+            http_client=get_openai_http_client(),
+        ),
+    )
+
+
+def get_embeddings_model() -> OpenAIEmbeddings:
+    """Return the shared OpenAI embeddings client."""
+    api_key = _require_openai_api_key()
+    return get_client(
+        "embeddings",
+        lambda: OpenAIEmbeddings(
+            model=EMBEDDING_MODEL_NAME,
+            dimensions=OPENAI_EMBEDDING_DIMENSION,
+            api_key=SecretStr(api_key),
+            http_client=get_openai_http_client(),
+        ),
+    )
+
+
+def create_async_embeddings_model(http_async_client: httpx.AsyncClient) -> OpenAIEmbeddings:
+    """Return an embeddings client for async calls on the caller's event loop.
+
+    Async connections are bound to one event loop, so these clients are not shared; the caller
+    owns http_async_client and closes it with the loop. Retries are left to the caller.
+    """
+    return OpenAIEmbeddings(
+        model=EMBEDDING_MODEL_NAME,
+        dimensions=OPENAI_EMBEDDING_DIMENSION,
+        api_key=SecretStr(_require_openai_api_key()),
+        http_client=get_openai_http_client(),
+        http_async_client=http_async_client,
+        max_retries=0,
+    )
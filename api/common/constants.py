@@ -26,6 +26,21 @@ DOCUMENT_STATUS_CHOICES = [
     (DOC_STATUS_FAILED, "Failed"),
 ]
 
+# Document Metadata Statuses (LLM title/description/summary, generated once chunks are searchable)
+DOC_METADATA_PENDING = "pending"
+DOC_METADATA_COMPLETED = "completed"
+DOC_METADATA_FAILED = "failed"
+
+DOCUMENT_METADATA_STATUS_CHOICES = [
+    (DOC_METADATA_PENDING, "Pending"),
+    (DOC_METADATA_COMPLETED, "Completed"),
+    (DOC_METADATA_FAILED, "Failed"),
+]
+
+# Bump when extraction, chunking or embedding changes so identical uploads are reprocessed
+# instead of copied from documents processed the old way
+DOCUMENT_PIPELINE_VERSION = 2
+
 # Document Sources
 DOC_SOURCE_UPLOAD = "upload"
 DOC_SOURCE_URL = "url"
@@ -76,8 +91,20 @@ CHAT_ROLE_CHOICES = [
 # Chunk Processing
 DEFAULT_CHUNK_SIZE = 2000
 DEFAULT_CHUNK_OVERLAP = 400
+EMBEDDING_RETRY_BASE_DELAY_SECONDS = 1.0  # Doubled on each retry of a failed batch
 CHUNK_PREVIEW_LENGTH = 200
 
+# Boilerplate and near-duplicate chunks (dropped before embedding)
+BOILERPLATE_SAMPLE_PAGES = 100  # PDF pages scanned for repeated header/footer lines
+BOILERPLATE_MIN_PAGES = 3  # Repeated lines are only stripped from PDFs with this many pages
+BOILERPLATE_LINE_PAGE_FRACTION = 0.5  # A line on at least this share of pages is boilerplate
+BOILERPLATE_EDGE_LINES = 3  # Only this many lines at the top and bottom of a page are checked
+BOILERPLATE_NUMBERED_LINE_MAX_WORDS = 4  # Longer lines must match numbers too, unless mostly digits
+NEAR_DUPLICATE_SHINGLE_WORDS = 5
+NEAR_DUPLICATE_MINHASH_PERMUTATIONS = 64
+NEAR_DUPLICATE_LSH_BANDS = 16  # Permutations are split into bands to find candidate pairs
+NEAR_DUPLICATE_JACCARD_THRESHOLD = 0.9  # Estimated shingle overlap that drops a later chunk
+
 # LLM & AI Configuration
 LLM_MODEL_NAME = "gpt-4o-mini"
 EMBEDDING_MODEL_NAME = "text-embedding-3-small"
@@ -95,6 +122,36 @@ WARN_FULL_DOCUMENT_CHARS = 100000
 # Embedding
 OPENAI_EMBEDDING_DIMENSION = 256
 
+# Vector Index (pgvector HNSW build parameters, baked into the migration)
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+# Oldest pgvector extension supported: halfvec/bit need 0.7, HNSW iterative scans 0.8
+PGVECTOR_MIN_VERSION = (0, 8)
+HNSW_ITERATIVE_SCAN_CHOICES = ["relaxed_order", "strict_order"]
+
+# Embedding search storage: float32 column, halfvec shadow, or binary (bit) shadow + re-rank
+EMBEDDING_STORAGE_VECTOR = "vector"
+EMBEDDING_STORAGE_HALFVEC = "halfvec"
+EMBEDDING_STORAGE_BINARY = "binary"
+
+EMBEDDING_STORAGE_CHOICES = [
+    EMBEDDING_STORAGE_VECTOR,
+    EMBEDDING_STORAGE_HALFVEC,
+    EMBEDDING_STORAGE_BINARY,
+]
+
+# Full-text Search (hybrid retrieval)
+TEXT_SEARCH_CONFIG = "english"
+HYBRID_RRF_K = 60  # Reciprocal rank fusion damping constant
+
+SEARCH_MODE_VECTOR = "vector"
+SEARCH_MODE_HYBRID = "hybrid"
+
+# Retrieval plans picked per search from the estimated candidate chunk count
+SEARCH_PLAN_EXACT = "exact"  # Sequential scan in Postgres, no ANN index
+SEARCH_PLAN_ANN = "ann"  # HNSW index walk in Postgres
+SEARCH_PLAN_MEMORY = "memory"  # NumPy over the user's memory-mapped snapshot
+
 # Document Summary
 SUMMARY_MAX_TOKENS = 1000
 SUMMARY_TEMPERATURE = 0.3
@@ -108,6 +165,11 @@ TITLE_TEMPERATURE = 0.3
 MAX_FILE_SIZE_MB = 10
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+# S3 Downloads (objects at or above the threshold are fetched as parallel ranged GETs)
+S3_DOWNLOAD_MULTIPART_THRESHOLD_BYTES = 4 * 1024 * 1024
+S3_DOWNLOAD_PART_SIZE_BYTES = 2 * 1024 * 1024
+S3_DOWNLOAD_MAX_CONCURRENCY = 8
+
 # Google OAuth
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
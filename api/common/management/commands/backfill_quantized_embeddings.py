@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from common.constants import (
+    EMBEDDING_STORAGE_BINARY,
+    EMBEDDING_STORAGE_HALFVEC,
+    OPENAI_EMBEDDING_DIMENSION,
+)
+from config.settings import EMBEDDING_SEARCH_STORAGE
+
+# Shadow column and the SQL expression that derives it from the float32 embedding
+SHADOW_COLUMNS = {
+    EMBEDDING_STORAGE_HALFVEC: (
+        "embedding_half",
+        f"c.embedding::halfvec({OPENAI_EMBEDDING_DIMENSION})",
+    ),
+    EMBEDDING_STORAGE_BINARY: (
+        "embedding_bits",
+        f"binary_quantize(c.embedding)::bit({OPENAI_EMBEDDING_DIMENSION})",
+    ),
+}
+
+# Each batch commits on its own; SKIP LOCKED lets the backfill run next to live ingestion
+BACKFILL_BATCH_SQL = """
+WITH batch AS (
+    SELECT id
+    FROM document_chunks
+    WHERE {column} IS NULL
+    ORDER BY id
+    LIMIT %(batch_size)s
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE document_chunks c
+SET {column} = {expression}
+FROM batch
+WHERE c.id = batch.id
+"""
+
+
+class Command(BaseCommand):
+    help = "Populate the halfvec or binary shadow embedding column for existing chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--storage",
+            choices=sorted(SHADOW_COLUMNS),
+            default=EMBEDDING_SEARCH_STORAGE
+            if EMBEDDING_SEARCH_STORAGE in SHADOW_COLUMNS
+            else None,
+            help="Shadow column to fill (defaults to EMBEDDING_SEARCH_STORAGE).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Chunks updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        storage = options.get("storage")
+        if not storage:
+            raise CommandError("Pass --storage halfvec or --storage binary.")
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        column, expression = SHADOW_COLUMNS[storage]
+        sql = BACKFILL_BATCH_SQL.format(column=column, expression=expression)
+
+        total = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, {"batch_size": batch_size})
+                updated = cursor.rowcount
+            if not updated:
+                break
+            total += updated
+            self.stdout.write(f"Backfilled {total} chunks...")
+
+        self.stdout.write(self.style.SUCCESS(f"{column} populated for {total} chunks."))
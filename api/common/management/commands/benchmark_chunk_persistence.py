@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from common.constants import (
+    DEFAULT_CHUNK_SIZE,
+    DOC_STATUS_PROCESSING,
+    EMBEDDING_STORAGE_CHOICES,
+    OPENAI_EMBEDDING_DIMENSION,
+)
+from config.settings import EMBEDDING_SEARCH_STORAGE
+from document.models import Document, DocumentChunk, quantized_embedding_fields
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Compare bulk_create and binary COPY for persisting one document's chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunks", type=int, default=10000, help="Chunks per document.")
+        parser.add_argument(
+            "--chunk-chars", type=int, default=DEFAULT_CHUNK_SIZE, help="Characters per chunk."
+        )
+        parser.add_argument(
+            "--storage",
+            choices=EMBEDDING_STORAGE_CHOICES,
+            default=EMBEDDING_SEARCH_STORAGE,
+            help="Shadow embedding column to write alongside the float32 embedding.",
+        )
+
+    def handle(self, *args, **options):
+        count = options["chunks"]
+        storage = options["storage"]
+        rng = np.random.default_rng(0)
+        embeddings = rng.uniform(-1, 1, (count, OPENAI_EMBEDDING_DIMENSION)).astype(np.float32)
+        texts = [
+            f"chunk {order} " + "lorem ipsum dolor sit amet " * (options["chunk_chars"] // 27)
+            for order in range(count)
+        ]
+
+        # Everything runs in one transaction that is rolled back, leaving no rows behind
+        with transaction.atomic():
+            owner = User.objects.create(
+                email=f"benchmark-{uuid.uuid4().hex}@example.com", full_name="Benchmark"
+            )
+            document = Document.objects.create(
+                owner=owner, title="Persistence benchmark", status=DOC_STATUS_PROCESSING
+            )
+
+            def build() -> list[DocumentChunk]:
+                return [
+                    DocumentChunk(
+                        document=document,
+                        owner=owner,
+                        is_searchable=True,
+                        order=order,
+                        text=texts[order],
+                        embedding=embeddings[order].tolist(),
+                        **quantized_embedding_fields(embeddings[order], storage),
+                    )
+                    for order in range(count)
+                ]
+
+            self.stdout.write(f"{count} chunks, {options['chunk_chars']} chars, storage={storage}")
+            for label, persist in (
+                (
+                    "bulk_create",
+                    lambda rows: DocumentChunk.objects.bulk_create(rows, batch_size=100),
+                ),
+                ("binary COPY", lambda rows: DocumentChunk.objects.bulk_copy(rows, storage)),
+            ):
+                rows = build()
+                started = time.perf_counter()
+                with transaction.atomic():
+                    persist(rows)
+                elapsed = time.perf_counter() - started
+                stored = DocumentChunk.objects.filter(document=document).count()
+                DocumentChunk.objects.filter(document=document).delete()
+                self.stdout.write(
+                    f"{label:>12}: {elapsed:.2f}s ({stored / elapsed:,.0f} chunks/s, {stored} rows)"
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from pgvector import Vector
+
+from chat.retrieval import search_chunks
+from common.constants import EMBEDDING_STORAGE_CHOICES
+
+SAMPLE_QUERIES_SQL = """
+SELECT embedding::text, owner_id
+FROM document_chunks
+WHERE is_searchable
+ORDER BY random()
+LIMIT %(sample_size)s
+"""
+
+# Sequential scan over the float32 column is the ground truth every storage is scored against
+EXACT_SEARCH_SQL = """
+SELECT c.id
+FROM document_chunks c
+WHERE c.is_searchable AND c.owner_id = %(owner_id)s
+ORDER BY c.embedding <=> %(embedding)s::vector
+LIMIT %(top_k)s
+"""
+
+INDEX_SIZES_SQL = """
+SELECT indexname, pg_size_pretty(pg_relation_size(indexname::regclass))
+FROM pg_indexes
+WHERE tablename = 'document_chunks' AND indexname = ANY(%(names)s)
+ORDER BY indexname
+"""
+
+STORAGE_INDEXES = [
+    "document_chunk_embedding_hnsw",
+    "document_chunk_search_half",
+    "document_chunk_search_bits",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare recall@k and latency of vector search across embedding storages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--storage",
+            action="append",
+            choices=EMBEDDING_STORAGE_CHOICES,
+            help="Storage to benchmark; repeat for several (defaults to all).",
+        )
+        parser.add_argument("--queries", type=int, default=50, help="Sampled query count.")
+        parser.add_argument("--top-k", type=int, default=10, help="Results per query.")
+        parser.add_argument(
+            "--route-documents",
+            type=int,
+            default=0,
+            help="Centroid-routed documents per search (0 ranks every chunk).",
+        )
+
+    def handle(self, *args, **options):
+        storages = options.get("storage") or EMBEDDING_STORAGE_CHOICES
+        top_k = options["top_k"]
+
+        with connection.cursor() as cursor:
+            cursor.execute(SAMPLE_QUERIES_SQL, {"sample_size": options["queries"]})
+            samples = [
+                (Vector.from_text(embedding).to_list(), owner_id)
+                for embedding, owner_id in cursor.fetchall()
+            ]
+        if not samples:
+            raise CommandError("No searchable chunks to sample queries from.")
+
+        truth = [self._exact_search(embedding, owner_id, top_k) for embedding, owner_id in samples]
+
+        self.stdout.write(
+            f"{len(samples)} queries, top_k={top_k}, route_documents={options['route_documents']}"
+        )
+        for storage in storages:
+            recalls: list[float] = []
+            latencies: list[float] = []
+            for (embedding, owner_id), expected in zip(samples, truth):
+                started = time.perf_counter()
+                hits = search_chunks(
+                    [embedding],
+                    top_k=top_k,
+                    snippet_length=0,
+                    owner_id=owner_id,
+                    storage=storage,
+                    route_documents=options["route_documents"],
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                found = {hit["chunk_id"] for hit in hits}
+                recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f"{storage:>8}: recall@{top_k}={statistics.mean(recalls):.3f} "
+                f"p50={statistics.median(latencies):.1f}ms p95={p95:.1f}ms"
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute(INDEX_SIZES_SQL, {"names": STORAGE_INDEXES})
+            for name, size in cursor.fetchall():
+                self.stdout.write(f"{name}: {size}")
+
+    def _exact_search(self, embedding: list[float], owner_id, top_k: int) -> set[str]:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            cursor.execute(
+                EXACT_SEARCH_SQL,
+                {"owner_id": owner_id, "embedding": Vector(embedding).to_text(), "top_k": top_k},
+            )
+            return {str(chunk_id) for (chunk_id,) in cursor.fetchall()}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from common.constants import (
+    DOC_STATUS_COMPLETED,
+    DOC_STATUS_FAILED,
+    DOC_STATUS_QUEUED,
+    DOCUMENT_PIPELINE_VERSION,
+)
+from document.models import Document
+from document.tasks import process_document_task
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-queue completed or failed documents for processing. Their chunks are kept and "
+        "reconciled with the new ones, so unchanged chunks are not rewritten."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("document_ids", nargs="*", help="Documents to reprocess.")
+        parser.add_argument(
+            "--outdated",
+            action="store_true",
+            help=f"Also reprocess documents from before pipeline version {DOCUMENT_PIPELINE_VERSION}.",
+        )
+        parser.add_argument(
+            "--failed", action="store_true", help="Also reprocess every failed document."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            document_ids = {uuid.UUID(document_id) for document_id in options["document_ids"]}
+        except ValueError as exc:
+            raise CommandError(f"Invalid document id: {exc}") from exc
+        if not (document_ids or options["outdated"] or options["failed"]):
+            raise CommandError("Pass document ids, --outdated or --failed.")
+
+        documents = Document.objects.none()
+        if document_ids:
+            documents |= Document.objects.filter(
+                id__in=document_ids, status__in=[DOC_STATUS_COMPLETED, DOC_STATUS_FAILED]
+            )
+        if options["outdated"]:
+            documents |= Document.objects.filter(
+                status=DOC_STATUS_COMPLETED, pipeline_version__lt=DOCUMENT_PIPELINE_VERSION
+            )
+        if options["failed"]:
+            documents |= Document.objects.filter(status=DOC_STATUS_FAILED)
+
+        with transaction.atomic():
+            requeued_ids = list(
+                documents.select_for_update().order_by("created_at").values_list("id", flat=True)
+            )
+            # update() leaves the chunks as they are: a completed document keeps serving its
+            # current chunks until the new run replaces them
+            Document.objects.filter(id__in=requeued_ids).update(
+                status=DOC_STATUS_QUEUED,
+                updated_at=timezone.now(),
+            )
+            for document_id in requeued_ids:
+                transaction.on_commit(
+                    lambda document_id=document_id: process_document_task.delay(str(document_id))
+                )
+
+        skipped = len(document_ids - set(requeued_ids))
+        if skipped:
+            self.stdout.write(
+                self.style.WARNING(f"Skipped {skipped} documents that are not completed or failed.")
+            )
+        self.stdout.write(self.style.SUCCESS(f"Re-queued {len(requeued_ids)} documents."))
@@ -10,6 +10,7 @@ from chat.models import ChatMessage, ChatSession
 from common.constants import (
     CHAT_ROLE_ASSISTANT,
     CHAT_ROLE_USER,
+    DOC_METADATA_COMPLETED,
     DOC_SOURCE_INTERNAL,
     DOC_SOURCE_UPLOAD,
     DOC_STATUS_COMPLETED,
@@ -23,7 +24,13 @@ from common.constants import (
     PLAN_LIMITS,
     PLAN_TYPE_FREE,
 )
-from document.models import Document, DocumentChunk
+from document.models import (
+    Document,
+    DocumentChunk,
+    embedding_centroid,
+    quantized_embedding_fields,
+)
+from document.snapshots import invalidate_snapshot
 from plan.models import Plan
 from user.models import User, UserPersonalization
 
@@ -221,18 +228,31 @@ class Command(BaseCommand):
                     "source_name": spec["source_name"],
                     "description": spec["description"],
                     "summary": spec["summary"],
+                    # Seeded descriptions and summaries stand in for generated metadata
+                    "metadata_status": DOC_METADATA_COMPLETED,
                 },
             )
 
             doc.chunks.all().delete()
-            for chunk in spec["chunks"]:
-                DocumentChunk.objects.create(
+            DocumentChunk.objects.bulk_copy(
+                DocumentChunk(
                     document=doc,
+                    owner=user,
+                    is_searchable=doc.status == DOC_STATUS_COMPLETED,
                     order=chunk["order"],
                     text=chunk["text"],
                     embedding=chunk["embedding"],
+                    **quantized_embedding_fields(chunk["embedding"]),
                 )
+                for chunk in spec["chunks"]
+            )
+            doc.chunk_count = len(spec["chunks"])
+            doc.centroid = embedding_centroid([chunk["embedding"] for chunk in spec["chunks"]])
+            doc.save(update_fields=["chunk_count", "centroid"])
             seeded[spec["title"]] = doc
+
+        # The chunks were rewritten without a status change, so the signals did not invalidate
+        transaction.on_commit(lambda: invalidate_snapshot(user.id))
         return seeded
 
     def _seed_chats(self, *, user: User, docs: dict[str, Document]):
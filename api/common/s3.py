@@ -1,26 +1,27 @@
-import boto3
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from mypy_boto3_s3.client import S3Client
 
-from config.settings import (
-    AWS_ACCESS_KEY_ID,
-    AWS_S3_BUCKET,
-    AWS_S3_REGION,
-    AWS_SECRET_ACCESS_KEY,
+from common import clients
+from common.constants import (
+    S3_DOWNLOAD_MAX_CONCURRENCY,
+    S3_DOWNLOAD_MULTIPART_THRESHOLD_BYTES,
+    S3_DOWNLOAD_PART_SIZE_BYTES,
 )
+from config.settings import AWS_S3_BUCKET, AWS_S3_REGION
 
 
 def get_s3_client() -> S3Client:
-    """Return a configured S3 client for the configured bucket."""
+    """Return the process-wide S3 client for the configured bucket."""
     if not AWS_S3_BUCKET:
         raise ValueError("AWS_S3_BUCKET not configured")
 
-    return boto3.client(
-        "s3",
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_S3_REGION,
-    )
+    return clients.get_s3_client()
 
 
 def _parse_storage_url(storage_url: str) -> tuple[str, str]:
@@ -66,16 +67,31 @@ def generate_presigned_upload_url(key: str, content_type: str, expires_in: int =
     )
 
 
-def download_file(storage_url: str) -> bytes:
-    """Download file from S3 and return file data as bytes."""
+DOWNLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_DOWNLOAD_MULTIPART_THRESHOLD_BYTES,
+    multipart_chunksize=S3_DOWNLOAD_PART_SIZE_BYTES,
+    max_concurrency=S3_DOWNLOAD_MAX_CONCURRENCY,
+)
+
+
+@contextmanager
+def download_to_temp_file(storage_url: str, suffix: str = "") -> Iterator[str]:
+    """Download file from S3 into a temporary file and yield its path.
+
+    The object is streamed to disk instead of being held in memory; objects above
+    S3_DOWNLOAD_MULTIPART_THRESHOLD_BYTES are fetched as parallel byte-range GETs.
+    The file is removed when the context exits.
+    """
     s3_client = get_s3_client()
     bucket, key = _parse_storage_url(storage_url)
 
-    try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        return response["Body"].read()
-    except ClientError as e:
-        raise ValueError(f"S3 download failed for {storage_url}: {e}") from e
+    with tempfile.TemporaryDirectory(prefix="s3-download-") as directory:
+        path = os.path.join(directory, f"object{suffix}")
+        try:
+            s3_client.download_file(bucket, key, path, Config=DOWNLOAD_TRANSFER_CONFIG)
+        except ClientError as e:
+            raise ValueError(f"S3 download failed for {storage_url}: {e}") from e
+        yield path
 
 
 def delete_file(storage_url: str) -> None:
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -30,6 +31,26 @@ AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET")
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Connection pool sizes for the process-wide clients (see common.clients)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+
+# pgvector HNSW search tuning (applied per transaction when searching)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "100"))
+# "relaxed_order" or "strict_order": without an iterative scan, filtered searches return fewer
+# than top_k rows (pgvector >= 0.8, enforced by the document.E001 system check)
+HNSW_ITERATIVE_SCAN = os.getenv("HNSW_ITERATIVE_SCAN", "relaxed_order")
+
+# Which embedding column the ANN first pass uses: "vector", "halfvec" or "binary"
+# (halfvec/binary need `manage.py backfill_quantized_embeddings` for chunks stored before)
+EMBEDDING_SEARCH_STORAGE = os.getenv("EMBEDDING_SEARCH_STORAGE", "vector")
+# Binary mode fetches top_k * oversampling Hamming candidates before the exact cosine re-rank
+BINARY_SEARCH_OVERSAMPLING = int(os.getenv("BINARY_SEARCH_OVERSAMPLING", "10"))
+# Library-wide vector search only ranks chunks of the N documents with the closest centroids (0 = all)
+CENTROID_ROUTING_DOCUMENTS = int(os.getenv("CENTROID_ROUTING_DOCUMENTS", "20"))
+# Searches over at most this many candidate chunks skip the ANN index and scan exactly
+EXACT_SEARCH_MAX_CHUNKS = int(os.getenv("EXACT_SEARCH_MAX_CHUNKS", "1000"))
+
 INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.auth.apps.AuthConfig",
@@ -141,9 +162,58 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Redis for the Celery broker and results. Nothing in it may be evicted (a lost chord counter
+# never fires its callback), so compose.yml and deployment.sh run it with no memory cap.
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Separate Redis instance for the embedding caches, snapshot tokens and pipeline artifacts, all
+# rebuildable: compose.yml and deployment.sh cap it at REDIS_CACHE_MAXMEMORY with
+# maxmemory-policy allkeys-lru, so the least recently used keys are evicted first
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6380/0")
+
+# Query embedding cache (sliding TTL)
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "604800"))
+
+# Chunk embeddings keyed by text hash, so reprocessing only embeds changed chunks (0 disables)
+CHUNK_EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("CHUNK_EMBEDDING_CACHE_TTL_SECONDS", "604800"))
+
+# Per-user embedding snapshots memory-mapped for in-process exact search. Libraries with more
+# searchable chunks than EMBEDDING_SNAPSHOT_MAX_CHUNKS (0 disables snapshots) use Postgres.
+EMBEDDING_SNAPSHOT_DIR = Path(
+    os.getenv("EMBEDDING_SNAPSHOT_DIR", Path(tempfile.gettempdir()) / "embedding-snapshots")
+)
+EMBEDDING_SNAPSHOT_MAX_CHUNKS = int(os.getenv("EMBEDDING_SNAPSHOT_MAX_CHUNKS", "5000"))
+
+# PDFs with at least this many pages are extracted by page range across processes
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Embedding requests are packed with consecutive chunks up to this many tokens and inputs
+# (OpenAI allows 300k tokens and 2048 inputs per request); each is one pipeline subtask
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "50000"))
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "512"))
+# Embedding requests in flight per document, and retries per batch on 429/5xx/connection errors
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+
+# Intermediate outputs of a document processing run, kept in Redis between pipeline stages
+PIPELINE_ARTIFACT_TTL_SECONDS = int(os.getenv("PIPELINE_ARTIFACT_TTL_SECONDS", "86400"))
+# Retries per pipeline stage for transient OpenAI/S3/Redis/database errors
+PIPELINE_STAGE_MAX_RETRIES = int(os.getenv("PIPELINE_STAGE_MAX_RETRIES", "5"))
+# Documents processing for longer than this without an update are presumed lost (a dead worker,
+# a chord callback that never fired) and sent back to queued by Beat. Keep it well above the
+# longest run, including stage retries, or a slow run is started a second time.
+PIPELINE_STUCK_AFTER_SECONDS = int(os.getenv("PIPELINE_STUCK_AFTER_SECONDS", "3600"))
+# Files of at least this many bytes are chunked while they are extracted, then embedded and
+# stored STREAMING_WINDOW_CHUNKS chunks at a time, so worker memory stays bounded (0 disables).
+# Keep it below MAX_FILE_SIZE_BYTES, the upload cap, or no file ever streams.
+STREAMING_PROCESSING_MIN_BYTES = int(
+    os.getenv("STREAMING_PROCESSING_MIN_BYTES", str(4 * 1024 * 1024))
+)
+STREAMING_WINDOW_CHUNKS = int(os.getenv("STREAMING_WINDOW_CHUNKS", "1024"))
+
 # Celery / background jobs
-CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-CELERY_RESULT_BACKEND = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_TASK_DEFAULT_QUEUE = "default"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
@@ -3,14 +3,26 @@ set -euo pipefail
 
 PORT="${PORT:-8000}"
 export REDIS_URL="redis://127.0.0.1:6379/0"
+export CACHE_REDIS_URL="redis://127.0.0.1:6380/0"
 
 echo "Starting Redis..."
+# Celery broker and results: no memory cap, so chord counters and queues are never evicted
 redis-server \
   --bind 127.0.0.1 \
   --protected-mode yes \
   --save "" \
   --appendonly no &
 REDIS_PID=$!
+# Caches, snapshot tokens and pipeline artifacts: evicted least recently used first at the cap
+redis-server \
+  --port 6380 \
+  --bind 127.0.0.1 \
+  --protected-mode yes \
+  --save "" \
+  --appendonly no \
+  --maxmemory "${REDIS_CACHE_MAXMEMORY:-256mb}" \
+  --maxmemory-policy allkeys-lru &
+CACHE_REDIS_PID=$!
 
 echo "Running database migrations..."
 python manage.py migrate --noinput
@@ -31,6 +43,6 @@ wait -n "$API_PID"
 EXIT_CODE=$?
 
 echo "API exited, shutting down..."
-kill -TERM "$CELERY_PID" "$REDIS_PID" 2>/dev/null || true
+kill -TERM "$CELERY_PID" "$REDIS_PID" "$CACHE_REDIS_PID" 2>/dev/null || true
 wait || true
 exit "$EXIT_CODE"
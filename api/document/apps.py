@@ -6,6 +6,7 @@ class DocumentConfig(AppConfig):
     name = "document"
 
     def ready(self):
+        import document.checks  # noqa: F401
         import document.signals  # noqa: F401
 
         try:
@@ -0,0 +1,75 @@
+"""Intermediate artifacts handed between the stages of a document processing run.
+
+Each run (one claim of a queued document) gets its own id, and every stage writes its output to
+Redis under that id with a TTL, so a retried stage picks up where the previous one stopped
+instead of downloading and extracting again. Artifacts are deleted once the run persists; the
+TTL cleans up after runs that never finish.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import numpy as np
+
+from common.cache import get_redis_client
+from common.constants import OPENAI_EMBEDDING_DIMENSION
+from config.settings import PIPELINE_ARTIFACT_TTL_SECONDS
+
+ARTIFACT_KEY = "document-pipeline:{run_id}:{name}"
+TEXT_ARTIFACT = "text"
+
+
+class ArtifactMissing(LookupError):
+    """An earlier stage's output expired or was evicted; the run has to start over."""
+
+
+def chunk_batch_artifact(batch_index: int) -> str:
+    return f"chunks:{batch_index}"
+
+
+def embedding_batch_artifact(batch_index: int) -> str:
+    return f"embeddings:{batch_index}"
+
+
+def _key(run_id: str, name: str) -> str:
+    return ARTIFACT_KEY.format(run_id=run_id, name=name)
+
+
+def store_artifact(run_id: str, name: str, value: bytes) -> None:
+    get_redis_client().set(_key(run_id, name), value, ex=PIPELINE_ARTIFACT_TTL_SECONDS)
+
+
+def load_artifact(run_id: str, name: str) -> bytes:
+    value = get_redis_client().get(_key(run_id, name))
+    if value is None:
+        raise ArtifactMissing(f"Artifact {name} of run {run_id} is missing")
+    return value  # type: ignore[return-value]
+
+
+def clear_artifacts(run_id: str, batch_count: int) -> None:
+    names = [TEXT_ARTIFACT]
+    for batch_index in range(batch_count):
+        names += [chunk_batch_artifact(batch_index), embedding_batch_artifact(batch_index)]
+    get_redis_client().delete(*[_key(run_id, name) for name in names])
+
+
+def store_json(run_id: str, name: str, value: Any) -> None:
+    store_artifact(run_id, name, json.dumps(value).encode())
+
+
+def load_json(run_id: str, name: str) -> Any:
+    return json.loads(load_artifact(run_id, name))
+
+
+def store_embeddings(run_id: str, batch_index: int, embeddings: list[list[float]]) -> None:
+    # float32 is what pgvector stores, at half the size of JSON-encoded doubles
+    array = np.asarray(embeddings, dtype=np.float32)
+    store_artifact(run_id, embedding_batch_artifact(batch_index), array.tobytes())
+
+
+def load_embeddings(run_id: str, batch_index: int) -> list[list[float]]:
+    raw = load_artifact(run_id, embedding_batch_artifact(batch_index))
+    array = np.frombuffer(raw, dtype=np.float32).reshape(-1, OPENAI_EMBEDDING_DIMENSION)
+    return array.tolist()
@@ -0,0 +1,67 @@
+"""System checks for the Postgres features document search relies on."""
+
+from __future__ import annotations
+
+from django.core import checks
+from django.db import connections
+
+from common.constants import HNSW_ITERATIVE_SCAN_CHOICES, PGVECTOR_MIN_VERSION
+from config.settings import HNSW_ITERATIVE_SCAN
+
+# The installed extension, or the version CREATE EXTENSION would install on a fresh database
+PGVECTOR_VERSION_SQL = """
+SELECT COALESCE(
+    (SELECT extversion FROM pg_extension WHERE extname = 'vector'),
+    (SELECT default_version FROM pg_available_extensions WHERE name = 'vector')
+)
+"""
+
+
+def _parse_version(version: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in version.split(".") if part.isdigit())
+
+
+@checks.register()
+def check_hnsw_iterative_scan(app_configs, **kwargs) -> list[checks.CheckMessage]:
+    if HNSW_ITERATIVE_SCAN in HNSW_ITERATIVE_SCAN_CHOICES:
+        return []
+    return [
+        checks.Error(
+            f"HNSW_ITERATIVE_SCAN is {HNSW_ITERATIVE_SCAN!r}.",
+            hint=(
+                f"Use one of {', '.join(HNSW_ITERATIVE_SCAN_CHOICES)}; without an iterative "
+                "scan, filtered searches return fewer than top_k rows."
+            ),
+            id="document.E002",
+        )
+    ]
+
+
+# Tagged database, so it runs on `migrate` and `check --database` but not on every command
+@checks.register(checks.Tags.database)
+def check_pgvector_version(app_configs, databases=None, **kwargs) -> list[checks.CheckMessage]:
+    errors: list[checks.CheckMessage] = []
+    required = ".".join(str(part) for part in PGVECTOR_MIN_VERSION)
+    for alias in databases or []:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(PGVECTOR_VERSION_SQL)
+            row = cursor.fetchone()
+        version = row[0] if row else None
+        if version is None:
+            errors.append(
+                checks.Error(
+                    f"The pgvector extension is not available on database {alias!r}.",
+                    hint=f"Install pgvector >= {required}.",
+                    id="document.E001",
+                )
+            )
+        elif _parse_version(version) < PGVECTOR_MIN_VERSION:
+            errors.append(
+                checks.Error(
+                    f"Database {alias!r} has pgvector {version}; >= {required} is required "
+                    "for halfvec/bit columns and HNSW iterative scans.",
+                    hint=("Upgrade the pgvector package, then run ALTER EXTENSION vector UPDATE."),
+                    id="document.E001",
+                )
+            )
+    return errors
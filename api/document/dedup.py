@@ -0,0 +1,146 @@
+"""Boilerplate and near-duplicate removal, applied before chunks are embedded.
+
+Repeated lines (running headers, footers, page numbers) are found by counting on how many PDF
+pages each normalized line occurs among the first and last lines of the page, and stripped from
+those positions on every page. Near-duplicate chunks
+(repeated disclaimers, tables of contents, copied sections) are found with MinHash over word
+shingles and locality-sensitive hashing: the first occurrence is kept, later ones are dropped.
+
+Both are deterministic and only look at earlier input, so the in-memory and streaming paths
+drop exactly the same text.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from common.constants import (
+    BOILERPLATE_EDGE_LINES,
+    BOILERPLATE_LINE_PAGE_FRACTION,
+    BOILERPLATE_MIN_PAGES,
+    BOILERPLATE_NUMBERED_LINE_MAX_WORDS,
+    NEAR_DUPLICATE_JACCARD_THRESHOLD,
+    NEAR_DUPLICATE_LSH_BANDS,
+    NEAR_DUPLICATE_MINHASH_PERMUTATIONS,
+    NEAR_DUPLICATE_SHINGLE_WORDS,
+)
+
+_DIGITS = re.compile(r"\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Universal hashing h(x) = (a * x + b) mod p over 32-bit shingle hashes; p is the largest prime
+# below 2**32, so a * x + b stays within uint64
+_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20261017)
+_PERM_A = _rng.integers(1, int(_PRIME), NEAR_DUPLICATE_MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_PRIME), NEAR_DUPLICATE_MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def _normalize_line(line: str) -> str:
+    line = _WHITESPACE.sub(" ", line).strip().lower()
+    # Page numbers and dates change from page to page, so numbers in short or mostly-digit lines
+    # ("Page 3 of 12", "2024-05-01") match any number. Longer lines keep theirs: content lines
+    # that differ only in their figures are not the same line.
+    digits = sum(char.isdigit() for char in line)
+    if line.count(" ") < BOILERPLATE_NUMBERED_LINE_MAX_WORDS or 2 * digits >= len(
+        line.replace(" ", "")
+    ):
+        return _DIGITS.sub("#", line)
+    return line
+
+
+def _edge_line_indexes(lines: list[str]) -> set[int]:
+    """Return the indexes of the first and last few non-blank lines, where headers/footers sit."""
+    non_blank = [index for index, line in enumerate(lines) if line.strip()]
+    return set(non_blank[:BOILERPLATE_EDGE_LINES] + non_blank[-BOILERPLATE_EDGE_LINES:])
+
+
+def find_repeated_lines(pages: list[str]) -> set[str]:
+    """Return the normalized edge lines that occur on a large share of the given pages."""
+    if len(pages) < BOILERPLATE_MIN_PAGES:
+        return set()
+    counts: Counter[str] = Counter()
+    for page in pages:
+        lines = page.splitlines()
+        counts.update({_normalize_line(lines[index]) for index in _edge_line_indexes(lines)})
+    min_pages = max(BOILERPLATE_MIN_PAGES, math.ceil(BOILERPLATE_LINE_PAGE_FRACTION * len(pages)))
+    return {line for line, count in counts.items() if count >= min_pages}
+
+
+def strip_repeated_lines(pages: Iterable[str], repeated: set[str]) -> Iterator[str]:
+    """Yield each page without its repeated edge lines, skipping pages left without text."""
+    for page in pages:
+        if repeated:
+            lines = page.splitlines(keepends=True)
+            edges = _edge_line_indexes(lines)
+            page = "".join(
+                line
+                for index, line in enumerate(lines)
+                if index not in edges or _normalize_line(line) not in repeated
+            )
+        if page.strip():
+            yield page
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Return the MinHash signature of the text's lowercased word shingles."""
+    words = text.lower().split()
+    size = min(NEAR_DUPLICATE_SHINGLE_WORDS, len(words))
+    shingles = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    if not len(hashes):
+        return np.full(NEAR_DUPLICATE_MINHASH_PERMUTATIONS, int(_PRIME), dtype=np.uint32)
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateFilter:
+    """Flags chunks whose shingles mostly match a chunk seen earlier in the same document.
+
+    Each signature is cut into NEAR_DUPLICATE_LSH_BANDS bands; chunks sharing any band are
+    compared on the full signature. State grows by one signature per kept chunk.
+    """
+
+    def __init__(self):
+        self._rows = NEAR_DUPLICATE_MINHASH_PERMUTATIONS // NEAR_DUPLICATE_LSH_BANDS
+        self._signatures: list[np.ndarray] = []
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(NEAR_DUPLICATE_LSH_BANDS)]
+
+    def is_duplicate(self, text: str) -> bool:
+        """Return True for a near-duplicate of an earlier chunk, otherwise remember this one."""
+        signature = minhash_signature(text)
+        keys = [
+            signature[band * self._rows : (band + 1) * self._rows].tobytes()
+            for band in range(NEAR_DUPLICATE_LSH_BANDS)
+        ]
+        candidates = {
+            index for band, key in enumerate(keys) for index in self._buckets[band].get(key, ())
+        }
+        for index in candidates:
+            similarity = float(np.mean(self._signatures[index] == signature))
+            if similarity >= NEAR_DUPLICATE_JACCARD_THRESHOLD:
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        return False
+
+    def partition(self, chunks: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Split chunks, in order, into those to keep and near-duplicates to drop."""
+        kept: list[str] = []
+        dropped: list[str] = []
+        for chunk in chunks:
+            (dropped if self.is_duplicate(chunk) else kept).append(chunk)
+        return kept, dropped
@@ -0,0 +1,17 @@
+"""Content-addressed Redis cache for chunk embeddings, so reprocessing only embeds changed text.
+
+Keys hash the exact chunk text (see common.cache.EmbeddingCache for the key, encoding and TTL).
+"""
+
+from __future__ import annotations
+
+from common.cache import EmbeddingCache
+from common.constants import EMBEDDING_MODEL_NAME, OPENAI_EMBEDDING_DIMENSION
+from config.settings import CHUNK_EMBEDDING_CACHE_TTL_SECONDS
+
+chunk_embedding_cache = EmbeddingCache(
+    "chunk-embedding",
+    model_name=EMBEDDING_MODEL_NAME,
+    dimensions=OPENAI_EMBEDDING_DIMENSION,
+    ttl_seconds=CHUNK_EMBEDDING_CACHE_TTL_SECONDS,
+)
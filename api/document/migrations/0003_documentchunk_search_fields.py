@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0002_documentchunk_embedding_hnsw"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentchunk",
+            name="owner",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="document_chunks",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="documentchunk",
+            name="is_searchable",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE document_chunks AS c
+                SET owner_id = d.owner_id,
+                    is_searchable = (d.status = 'completed')
+                FROM document AS d
+                WHERE d.id = c.document_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="documentchunk",
+            name="owner",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="document_chunks",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block. The HNSW index from 0002
+    # is kept as it is rather than rebuilt as a partial one: search filters hidden chunks during
+    # its iterative scan, and a second HNSW build would double the migration time
+    atomic = False
+
+    dependencies = [
+        ("document", "0003_documentchunk_search_fields"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="documentchunk",
+            index=models.Index(
+                condition=models.Q(("is_searchable", True)),
+                fields=["owner", "document"],
+                name="document_chunk_owner_search",
+            ),
+        ),
+    ]
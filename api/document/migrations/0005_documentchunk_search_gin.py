@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block. An expression index
+    # instead of a stored tsvector column, so document_chunks is never rewritten
+    atomic = False
+
+    dependencies = [
+        ("document", "0004_documentchunk_search_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="documentchunk",
+            index=django.contrib.postgres.indexes.GinIndex(
+                models.Func(
+                    models.Value("english"),
+                    models.F("text"),
+                    function="to_tsvector",
+                    output_field=django.contrib.postgres.search.SearchVectorField(),
+                ),
+                condition=models.Q(("is_searchable", True)),
+                name="document_chunk_search_gin",
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:44
+
+import pgvector.django.bit
+import pgvector.django.halfvec
+import pgvector.django.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # halfvec and bit columns need the pgvector extension >= 0.7
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    atomic = False
+
+    dependencies = [
+        ("document", "0005_documentchunk_search_gin"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentchunk",
+            name="embedding_bits",
+            field=pgvector.django.bit.BitField(blank=True, length=256, null=True),
+        ),
+        migrations.AddField(
+            model_name="documentchunk",
+            name="embedding_half",
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=256, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name="documentchunk",
+            index=pgvector.django.indexes.HnswIndex(
+                condition=models.Q(("embedding_half__isnull", False), ("is_searchable", True)),
+                ef_construction=64,
+                fields=["embedding_half"],
+                m=16,
+                name="document_chunk_search_half",
+                opclasses=["halfvec_cosine_ops"],
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="documentchunk",
+            index=pgvector.django.indexes.HnswIndex(
+                condition=models.Q(("embedding_bits__isnull", False), ("is_searchable", True)),
+                ef_construction=64,
+                fields=["embedding_bits"],
+                m=16,
+                name="document_chunk_search_bits",
+                opclasses=["bit_hamming_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:53
+
+import pgvector.django.vector
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0006_documentchunk_quantized_embeddings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="centroid",
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=256, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE document d
+                SET centroid = s.centroid
+                FROM (
+                    SELECT document_id, AVG(embedding) AS centroid
+                    FROM document_chunks
+                    GROUP BY document_id
+                ) s
+                WHERE d.id = s.document_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0007_document_centroid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="chunk_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE document d
+                SET chunk_count = s.chunk_count
+                FROM (
+                    SELECT document_id, COUNT(*) AS chunk_count
+                    FROM document_chunks
+                    GROUP BY document_id
+                ) s
+                WHERE d.id = s.document_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0008_document_chunk_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="metadata_status",
+            field=models.CharField(
+                choices=[("pending", "Pending"), ("completed", "Completed"), ("failed", "Failed")],
+                default="pending",
+                max_length=32,
+            ),
+        ),
+        # Documents processed before this change got their metadata in the same step
+        migrations.RunSQL(
+            sql="UPDATE document SET metadata_status = 'completed' WHERE status = 'completed'",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
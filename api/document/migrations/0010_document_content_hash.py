@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0009_document_metadata_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="pipeline_version",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-17 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0010_document_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="duplicate_chunk_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="duplicate_chunk_tokens",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("document", "0011_document_duplicate_chunks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="metadata_edited",
+            field=models.BooleanField(default=False),
+        ),
+    ]
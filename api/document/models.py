@@ -1,20 +1,39 @@
 import uuid
+from typing import Iterable, Optional
 
+import numpy as np
 from django.conf import settings
-from django.db import models
-from django.db.models import Manager
-from pgvector.django import VectorField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+from django.db.models import Exists, F, Func, Manager, OuterRef, Q, Subquery, Value
+from django.utils import timezone
+from pgvector import Bit, HalfVector, Vector
+from pgvector.django import BitField, HalfVectorField, HnswIndex, VectorField
+from pgvector.psycopg.bit import register_bit_info
+from pgvector.psycopg.halfvec import register_halfvec_info
+from pgvector.psycopg.vector import register_vector_info
+from psycopg.types import TypeInfo
 
 from common.constants import (
+    DOC_METADATA_PENDING,
     DOC_SOURCE_UPLOAD,
+    DOC_STATUS_COMPLETED,
     DOC_STATUS_QUEUED,
+    DOCUMENT_METADATA_STATUS_CHOICES,
     DOCUMENT_SOURCE_CHOICES,
     DOCUMENT_STATUS_CHOICES,
     DOCUMENT_TYPE_CHOICES,
+    EMBEDDING_STORAGE_BINARY,
+    EMBEDDING_STORAGE_HALFVEC,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_M,
     MAX_STORAGE_URL_LENGTH,
     MAX_TITLE_LENGTH,
     OPENAI_EMBEDDING_DIMENSION,
+    TEXT_SEARCH_CONFIG,
 )
+from config.settings import EMBEDDING_SEARCH_STORAGE
 
 
 class Document(models.Model):
@@ -65,10 +84,29 @@ class Document(models.Model):
         blank=True,
         default=None,
     )
+    metadata_status = models.CharField(
+        max_length=32, choices=DOCUMENT_METADATA_STATUS_CHOICES, default=DOC_METADATA_PENDING
+    )
+    # Set once the user edits the title or description; re-ingests never regenerate them then
+    metadata_edited = models.BooleanField(default=False)
+    # SHA-256 of the uploaded file and the pipeline that processed it; identical uploads copy the
+    # chunks of a completed document with the same hash and version instead of reprocessing
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    pipeline_version = models.IntegerField(null=True, blank=True)
+    # Number of chunks, kept at ingest so search can plan without counting chunks
+    chunk_count = models.IntegerField(default=0)
+    # Near-duplicate chunks dropped before embedding, and their tokens (the embedding cost saved)
+    duplicate_chunk_count = models.IntegerField(default=0)
+    duplicate_chunk_tokens = models.IntegerField(default=0)
+    # Mean of the chunk embeddings, used to route library-wide search to the closest documents
+    centroid = VectorField(dimensions=OPENAI_EMBEDDING_DIMENSION, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    owner_id: uuid.UUID
     chunks: "Manager[DocumentChunk]"
+    # chunk_search_fields() as last stored, so saves that don't change them skip the chunk sync
+    _stored_search_fields: Optional[tuple[uuid.UUID, bool]] = None
 
     class Meta:
         db_table = "document"
@@ -77,22 +115,220 @@ class Document(models.Model):
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        document = super().from_db(db, field_names, values)
+        if {"owner_id", "status"}.issubset(field_names):
+            document._stored_search_fields = document.chunk_search_fields()
+        return document
+
+    def chunk_search_fields(self) -> tuple[uuid.UUID, bool]:
+        """Return what is denormalized onto the chunks: the owner and whether it is searchable."""
+        return self.owner_id, self.status == DOC_STATUS_COMPLETED
+
+
+def embedding_centroid(embeddings) -> Optional[list[float]]:
+    """Return the mean of the given embeddings (cosine routing ignores its norm)."""
+    if not len(embeddings):
+        return None
+    return np.mean(np.asarray(embeddings, dtype=np.float32), axis=0).tolist()
+
+
+def quantized_embedding_fields(
+    embedding, storage: str = EMBEDDING_SEARCH_STORAGE
+) -> dict[str, object]:
+    """Return the shadow embedding column values to store for the given search storage.
+
+    Only the configured shadow is written; the other stays NULL and out of its partial index.
+    Bits match pgvector's binary_quantize (1 where value > 0).
+    """
+    if storage == EMBEDDING_STORAGE_HALFVEC:
+        return {"embedding_half": list(embedding)}
+    if storage == EMBEDDING_STORAGE_BINARY:
+        return {"embedding_bits": "".join("1" if value > 0 else "0" for value in embedding)}
+    return {}
+
+
+COPY_DOCUMENT_CHUNKS_SQL = """
+INSERT INTO document_chunks (
+    id, document_id, owner_id, is_searchable, "order", text,
+    embedding, embedding_half, embedding_bits, created_at, updated_at
+)
+SELECT
+    gen_random_uuid(), %(document_id)s, %(owner_id)s, %(is_searchable)s, "order", text,
+    embedding, embedding_half, embedding_bits, now(), now()
+FROM document_chunks
+WHERE document_id = %(source_id)s
+"""
+
+
+COPY_CHUNK_COLUMNS = [
+    ("id", "uuid"),
+    ("document_id", "uuid"),
+    ("owner_id", "uuid"),
+    ("is_searchable", "bool"),
+    ('"order"', "int4"),
+    ("text", "text"),
+    ("embedding", "vector"),
+]
+
+
+def _register_vector_types(cursor) -> None:
+    """Register pgvector's binary dumpers on one psycopg cursor, leaving the connection as is."""
+    register_vector_info(cursor, TypeInfo.fetch(cursor.connection, "vector"))
+    register_bit_info(cursor, TypeInfo.fetch(cursor.connection, "bit"))
+    halfvec = TypeInfo.fetch(cursor.connection, "halfvec")
+    if halfvec is not None:
+        register_halfvec_info(cursor, halfvec)
+
+
+class DocumentChunkManager(Manager["DocumentChunk"]):
+    def bulk_copy(
+        self, chunks: Iterable["DocumentChunk"], storage: str = EMBEDDING_SEARCH_STORAGE
+    ) -> int:
+        """Insert unsaved chunks with a binary COPY ... FROM STDIN; returns the row count.
+
+        Much faster than bulk_create for large documents: rows stream in pgvector's binary
+        encoding instead of text-serialized vectors in parameterized INSERTs. Runs on the current
+        connection, so it joins the caller's transaction. Only the shadow column for storage is
+        written, as with quantized_embedding_fields.
+        """
+        columns = list(COPY_CHUNK_COLUMNS)
+        if storage == EMBEDDING_STORAGE_HALFVEC:
+            columns.append(("embedding_half", "halfvec"))
+        elif storage == EMBEDDING_STORAGE_BINARY:
+            columns.append(("embedding_bits", "bit"))
+        columns += [("created_at", "timestamptz"), ("updated_at", "timestamptz")]
+        sql = (
+            f"COPY document_chunks ({', '.join(name for name, _ in columns)}) "
+            "FROM STDIN WITH (FORMAT BINARY)"
+        )
+
+        now = timezone.now()
+        count = 0
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor  # the psycopg cursor under Django's wrapper
+            _register_vector_types(raw_cursor)
+            with raw_cursor.copy(sql) as copy:
+                copy.set_types([type_name for _, type_name in columns])
+                for chunk in chunks:
+                    row = [
+                        chunk.id,
+                        chunk.document_id,
+                        chunk.owner_id,
+                        chunk.is_searchable,
+                        chunk.order,
+                        chunk.text,
+                        Vector(chunk.embedding),
+                    ]
+                    if storage == EMBEDDING_STORAGE_HALFVEC:
+                        half = chunk.embedding_half
+                        row.append(HalfVector(half) if half is not None else None)
+                    elif storage == EMBEDDING_STORAGE_BINARY:
+                        bits = chunk.embedding_bits
+                        row.append(Bit(bits) if bits is not None else None)
+                    copy.write_row([*row, now, now])
+                    count += 1
+        return count
+
+    def copy_document_chunks(self, source_id, document: "Document", *, is_searchable: bool) -> int:
+        """Copy every chunk of source_id onto document in one INSERT ... SELECT."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                COPY_DOCUMENT_CHUNKS_SQL,
+                {
+                    "source_id": source_id,
+                    "document_id": document.id,
+                    "owner_id": document.owner_id,
+                    "is_searchable": is_searchable,
+                },
+            )
+            return cursor.rowcount
+
+    def sync_search_fields(self, document_ids) -> int:
+        """Copy owner and searchability from the parent documents onto their chunks."""
+        parent = Document.objects.filter(id=OuterRef("document_id"))
+        owner_id = Subquery(parent.values("owner_id")[:1])
+        is_searchable = Exists(parent.filter(status=DOC_STATUS_COMPLETED))
+        # Only rows that differ: both columns are indexed, so every rewrite is a non-HOT update
+        return (
+            self
+            .filter(document_id__in=document_ids)
+            .exclude(owner_id=owner_id, is_searchable=is_searchable)
+            .update(owner_id=owner_id, is_searchable=is_searchable)
+        )
+
 
 class DocumentChunk(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="chunks")
+    # Denormalized from Document so filtered vector search reads only this table
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="document_chunks",
+        db_index=False,
+    )
+    is_searchable = models.BooleanField(default=False)
     order = models.IntegerField()
     text = models.TextField()
     embedding = VectorField(dimensions=OPENAI_EMBEDDING_DIMENSION)
+    # Compact shadows of embedding used for the ANN first pass (see EMBEDDING_SEARCH_STORAGE)
+    embedding_half = HalfVectorField(dimensions=OPENAI_EMBEDDING_DIMENSION, null=True, blank=True)
+    embedding_bits = BitField(length=OPENAI_EMBEDDING_DIMENSION, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    document_id: uuid.UUID
+    owner_id: uuid.UUID
+    objects: DocumentChunkManager = DocumentChunkManager()
+
     class Meta:
         db_table = "document_chunks"
         unique_together = [["document", "order"]]
         ordering = ["document", "order"]
         indexes = [
             models.Index(fields=["document", "order"]),
+            models.Index(
+                name="document_chunk_owner_search",
+                fields=["owner", "document"],
+                condition=Q(is_searchable=True),
+            ),
+            # Covers hidden chunks too: searches filter them out during the iterative scan
+            HnswIndex(
+                name="document_chunk_embedding_hnsw",
+                fields=["embedding"],
+                m=HNSW_M,
+                ef_construction=HNSW_EF_CONSTRUCTION,
+                opclasses=["vector_cosine_ops"],
+            ),
+            HnswIndex(
+                name="document_chunk_search_half",
+                fields=["embedding_half"],
+                m=HNSW_M,
+                ef_construction=HNSW_EF_CONSTRUCTION,
+                opclasses=["halfvec_cosine_ops"],
+                condition=Q(is_searchable=True, embedding_half__isnull=False),
+            ),
+            HnswIndex(
+                name="document_chunk_search_bits",
+                fields=["embedding_bits"],
+                m=HNSW_M,
+                ef_construction=HNSW_EF_CONSTRUCTION,
+                opclasses=["bit_hamming_ops"],
+                condition=Q(is_searchable=True, embedding_bits__isnull=False),
+            ),
+            # Expression index: LEXICAL_HITS_SQL must use the same to_tsvector(...) to match it
+            GinIndex(
+                Func(
+                    Value(TEXT_SEARCH_CONFIG),
+                    F("text"),
+                    function="to_tsvector",
+                    output_field=SearchVectorField(),
+                ),
+                name="document_chunk_search_gin",
+                condition=Q(is_searchable=True),
+            ),
         ]
 
     def __str__(self):
@@ -0,0 +1,83 @@
+"""PDF text extraction, optionally fanned out over a process pool by page range.
+
+Kept free of Django imports so spawned pool workers can import it without app setup.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+
+def iter_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the non-empty text of pages [start, stop), one page at a time."""
+    pdf_document = fitz.open(file_path, filetype="pdf")
+    try:
+        page_count = pdf_document.page_count
+        for page_num in range(start, page_count if stop is None else min(stop, page_count)):
+            extracted = pdf_document[page_num].get_text() or ""
+            if extracted and isinstance(extracted, str):
+                yield extracted
+    finally:
+        pdf_document.close()
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> list[str]:
+    """Return the non-empty text of pages [start, stop), in page order."""
+    return list(iter_pdf_pages(file_path, start, stop))
+
+
+def _page_ranges(page_count: int, parts: int) -> list[tuple[int, int]]:
+    size, remainder = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for index in range(parts):
+        stop = start + size + (1 if index < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_pdf_pages(file_path: str, *, min_parallel_pages: int, max_workers: int) -> list[str]:
+    """Extract a PDF's non-empty page texts, splitting large files into page ranges across processes.
+
+    PDFs with fewer than min_parallel_pages pages (or max_workers <= 1) are read serially.
+    Workers are spawned rather than forked so they never inherit the caller's threads or
+    database connections; each opens the file from file_path itself. If the pool cannot run
+    (e.g. inside a daemonic worker), extraction falls back to a serial read.
+    """
+    pdf_document = fitz.open(file_path, filetype="pdf")
+    try:
+        page_count = pdf_document.page_count
+    finally:
+        pdf_document.close()
+
+    if max_workers <= 1 or page_count < min_parallel_pages:
+        return extract_page_range(file_path, 0, page_count)
+
+    # A few ranges per worker keeps the pool busy when some pages are much heavier
+    ranges = _page_ranges(page_count, max_workers * 4)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results = executor.map(
+                extract_page_range,
+                [file_path] * len(ranges),
+                [start for start, _ in ranges],
+                [stop for _, stop in ranges],
+            )
+            pages = [page for range_pages in results for page in range_pages]
+    except (AssertionError, BrokenProcessPool, OSError) as e:
+        logger.warning("Parallel PDF extraction unavailable, reading serially: %s", e)
+        return extract_page_range(file_path, 0, page_count)
+
+    return pages
@@ -1,37 +1,76 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
+import os
+import random
+from functools import lru_cache
 from html.parser import HTMLParser
+from itertools import chain, islice
+from typing import Any, Iterator, Optional
 
-import fitz
+import httpx
+import numpy as np
+import openai
+import tiktoken
 from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.db.models.functions import MD5
 from django.utils import timezone
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pydantic import BaseModel, Field, SecretStr
+from pydantic import BaseModel, Field
 
+from common.clients import create_async_embeddings_model, get_chat_model
 from common.constants import (
+    BOILERPLATE_SAMPLE_PAGES,
     DEFAULT_CHUNK_OVERLAP,
     DEFAULT_CHUNK_SIZE,
+    DOC_METADATA_COMPLETED,
+    DOC_METADATA_PENDING,
     DOC_STATUS_COMPLETED,
     DOC_TYPE_HTML,
     DOC_TYPE_MD,
     DOC_TYPE_PDF,
     DOC_TYPE_TXT,
+    DOCUMENT_PIPELINE_VERSION,
     EMBEDDING_MODEL_NAME,
+    EMBEDDING_RETRY_BASE_DELAY_SECONDS,
     LLM_MODEL_NAME,
-    OPENAI_EMBEDDING_DIMENSION,
     SUMMARY_CHUNKS_TO_USE,
     SUMMARY_MAX_TOKENS,
     SUMMARY_TEMPERATURE,
 )
-from common.s3 import download_file
-from config.settings import OPENAI_API_KEY
-from document.models import Document, DocumentChunk
+from common.s3 import download_to_temp_file
+from config.settings import (
+    EMBEDDING_BATCH_MAX_INPUTS,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+    OPENAI_API_KEY,
+    PDF_EXTRACTION_WORKERS,
+    PDF_PARALLEL_MIN_PAGES,
+    STREAMING_PROCESSING_MIN_BYTES,
+    STREAMING_WINDOW_CHUNKS,
+)
+from document.dedup import NearDuplicateFilter, find_repeated_lines, strip_repeated_lines
+from document.embedding_cache import chunk_embedding_cache
+from document.models import (
+    Document,
+    DocumentChunk,
+    embedding_centroid,
+    quantized_embedding_fields,
+)
+from document.pdf import extract_pdf_pages, iter_pdf_pages
+from document.snapshots import invalidate_snapshot
+from document.streaming import split_text_stream, strip_text
 
 logger = logging.getLogger(__name__)
 
+TEXT_READ_BLOCK_SIZE = 1024 * 1024
+
 
 class DocumentMetadata(BaseModel):
     """Structured schema for document metadata extracted by LLM."""
@@ -53,14 +92,143 @@ class _HTMLTextExtractor(HTMLParser):
     def __init__(self):
         super().__init__()
         self._parts: list[str] = []
+        self._pending: list[str] = []
 
     def handle_data(self, data: str) -> None:
-        if data and data.strip():
-            self._parts.append(data.strip())
+        # A text run can arrive in pieces when the input is fed in blocks; it is only
+        # complete at the next markup event
+        self._pending.append(data)
+
+    def _flush(self) -> None:
+        data = "".join(self._pending).strip()
+        self._pending = []
+        if data:
+            self._parts.append(data)
+
+    def handle_starttag(self, tag, attrs) -> None:
+        self._flush()
+
+    def handle_endtag(self, tag) -> None:
+        self._flush()
+
+    def handle_comment(self, data) -> None:
+        self._flush()
+
+    def handle_decl(self, decl) -> None:
+        self._flush()
+
+    def handle_pi(self, data) -> None:
+        self._flush()
+
+    def unknown_decl(self, data) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
 
     def get_text(self) -> str:
         return " ".join(self._parts)
 
+    def pop_parts(self) -> list[str]:
+        """Return the text parts parsed so far and forget them."""
+        parts, self._parts = self._parts, []
+        return parts
+
+
+@lru_cache(maxsize=1)
+def _embedding_encoding() -> tiktoken.Encoding:
+    return tiktoken.encoding_for_model(EMBEDDING_MODEL_NAME)
+
+
+def count_tokens(texts: list[str]) -> int:
+    return sum(len(tokens) for tokens in _embedding_encoding().encode_ordinary_batch(texts))
+
+
+def pack_embedding_batches(
+    chunks: list[str],
+    *,
+    max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+    max_inputs: int = EMBEDDING_BATCH_MAX_INPUTS,
+) -> list[list[str]]:
+    """Group consecutive chunks into embedding requests by token count.
+
+    Each batch holds at most max_inputs chunks totalling at most max_tokens tokens; a single
+    chunk over max_tokens gets a batch of its own. Order is preserved across batches.
+    """
+    token_counts = [len(tokens) for tokens in _embedding_encoding().encode_ordinary_batch(chunks)]
+
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    batch_tokens = 0
+    for chunk, tokens in zip(chunks, token_counts):
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_inputs):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def summary_chunk_orders(total_chunks: int) -> list[int]:
+    """Return the orders of the chunks sampled for metadata generation.
+
+    Strategy: Take first chunks (intro), some middle chunks (body), and last chunks (conclusion)
+    to create a representative sample without sending all chunks to the LLM.
+    """
+    if total_chunks <= SUMMARY_CHUNKS_TO_USE:
+        # Use all chunks if we have fewer than the limit
+        return list(range(total_chunks))
+
+    # Take chunks from beginning, middle, and end
+    # 40% from start, 30% from middle, 30% from end
+    start_count = max(1, int(SUMMARY_CHUNKS_TO_USE * 0.4))
+    middle_count = max(1, int(SUMMARY_CHUNKS_TO_USE * 0.3))
+    end_count = SUMMARY_CHUNKS_TO_USE - start_count - middle_count
+
+    middle_start = (total_chunks - middle_count) // 2
+    end_orders = range(total_chunks - end_count, total_chunks) if end_count > 0 else []
+    return [
+        *range(start_count),
+        *range(middle_start, middle_start + middle_count),
+        *end_orders,
+    ]
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(TEXT_READ_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def _aembed_batch(model: OpenAIEmbeddings, batch: list[str]) -> list[list[float]]:
+    """Embed one batch, retrying rate limits, server errors and dropped connections."""
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            return await model.aembed_documents(batch)
+        except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+            if attempt == EMBEDDING_MAX_RETRIES:
+                raise
+            delay = EMBEDDING_RETRY_BASE_DELAY_SECONDS * 2**attempt
+            if isinstance(e, openai.RateLimitError):
+                retry_after = e.response.headers.get("retry-after")
+                if retry_after and retry_after.replace(".", "", 1).isdigit():
+                    delay = max(delay, float(retry_after))
+            delay *= random.uniform(0.5, 1.5)  # jitter so throttled batches don't retry in step
+            logger.warning(
+                "Embedding batch failed (%s); retry %s/%s in %.1fs",
+                type(e).__name__,
+                attempt + 1,
+                EMBEDDING_MAX_RETRIES,
+                delay,
+            )
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
 
 class DocumentProcessor:
     """Encapsulates end-to-end document processing."""
@@ -73,64 +241,251 @@ class DocumentProcessor:
             chunk_size=DEFAULT_CHUNK_SIZE,
             chunk_overlap=DEFAULT_CHUNK_OVERLAP,
         )
-        self._embeddings_model = OpenAIEmbeddings(
-            model=EMBEDDING_MODEL_NAME,
-            dimensions=OPENAI_EMBEDDING_DIMENSION,
-            api_key=SecretStr(OPENAI_API_KEY),
-        )
-        self._llm = ChatOpenAI(
-            model=LLM_MODEL_NAME,
-            temperature=SUMMARY_TEMPERATURE,
-            api_key=SecretStr(OPENAI_API_KEY),
-        )
+        self._llm = get_chat_model(LLM_MODEL_NAME, SUMMARY_TEMPERATURE)
+
+    def extract_text(self, document: Document) -> Optional[str]:
+        """Download the file and extract its text.
 
-    def process(self, document: Document) -> None:
+        Returns None if the document's chunks are already stored and it is completed: either the
+        file is identical to a document that was already processed (its chunks, and metadata
+        if it has the same owner, have been copied), or it is large enough to be processed with stream_chunks.
+        """
         if not document.storage_url:
             raise ValueError("Document has no storage_url to download")
 
-        file_bytes = self._download_bytes(document)
-        text = self._extract_text(document=document, file_bytes=file_bytes)
-        chunks = self._chunk_text(text)
-        metadata = self._generate_metadata(chunks, document.title)
-        embeddings = self._embed_chunks(chunks)
-        self._persist_chunks(
-            document=document, chunks=chunks, embeddings=embeddings, metadata=metadata
+        # Stream the object to a temp file so workers never hold the raw file in memory
+        with download_to_temp_file(document.storage_url) as file_path:
+            if self.copy_duplicate(document, file_sha256(file_path)):
+                return None
+            if 0 < STREAMING_PROCESSING_MIN_BYTES <= os.path.getsize(file_path):
+                self.stream_chunks(document=document, file_path=file_path)
+                return None
+            return self._extract_text(document=document, file_path=file_path)
+
+    def copy_duplicate(self, document: Document, content_hash: str) -> bool:
+        """Record the file hash and copy a completed document with the same content, if any.
+
+        Chunks and embeddings are copied from any owner's document; title, description and
+        summary only from the same owner's. Re-ingested documents are never copied onto: their
+        own chunks are diffed instead, and their metadata is only regenerated if the content
+        changed and the user never edited it.
+        """
+        reingest = document.pipeline_version is not None
+        updates: dict[str, Any] = {"content_hash": content_hash}
+        if reingest and document.content_hash != content_hash and not document.metadata_edited:
+            updates["metadata_status"] = DOC_METADATA_PENDING
+        for field, value in updates.items():
+            setattr(document, field, value)
+        Document.objects.filter(id=document.id).update(**updates)
+        if reingest:
+            return False
+
+        with transaction.atomic():
+            # Locked so the source cannot be deleted or reprocessed while it is copied
+            source = (
+                Document.objects
+                .select_for_update()
+                .filter(
+                    content_hash=content_hash,
+                    # Extraction depends on the type: the same bytes uploaded as .txt and .md
+                    # (or .html) are not chunked alike
+                    document_type=document.document_type,
+                    pipeline_version=DOCUMENT_PIPELINE_VERSION,
+                    status=DOC_STATUS_COMPLETED,
+                )
+                .exclude(id=document.id)
+                # The owner's own copy first: it is the only one whose metadata may be reused
+                .annotate(
+                    same_owner=ExpressionWrapper(
+                        Q(owner_id=document.owner_id), output_field=BooleanField()
+                    )
+                )
+                .order_by("-same_owner", "-updated_at")
+                .first()
+            )
+            if source is None:
+                return False
+
+            DocumentChunk.objects.filter(document=document).delete()
+            copied = DocumentChunk.objects.copy_document_chunks(
+                source.id, document, is_searchable=True
+            )
+            if copied != source.chunk_count:
+                raise ValueError(
+                    f"Copied {copied} chunks from document {source.id}, "
+                    f"expected {source.chunk_count}"
+                )
+
+            updates = {
+                "status": DOC_STATUS_COMPLETED,
+                "chunk_count": source.chunk_count,
+                "centroid": source.centroid,
+                "pipeline_version": source.pipeline_version,
+                "duplicate_chunk_count": source.duplicate_chunk_count,
+                "duplicate_chunk_tokens": source.duplicate_chunk_tokens,
+                "metadata_status": DOC_METADATA_PENDING,
+            }
+            # Titles and descriptions can be hand-edited, so another user's are never copied;
+            # their copy keeps metadata_status pending and gets its own metadata generated
+            if (
+                source.metadata_status == DOC_METADATA_COMPLETED
+                and source.owner_id == document.owner_id
+            ):
+                updates.update(
+                    title=source.title,
+                    description=source.description,
+                    summary=source.summary,
+                    metadata_status=DOC_METADATA_COMPLETED,
+                    metadata_edited=source.metadata_edited,
+                )
+            for field, value in updates.items():
+                setattr(document, field, value)
+            Document.objects.filter(id=document.id).update(**updates, updated_at=timezone.now())
+
+            owner_id = document.owner_id
+            transaction.on_commit(lambda: invalidate_snapshot(owner_id))
+
+        logger.info(
+            "Document %s copied %s chunks from identical document %s",
+            document.id,
+            copied,
+            source.id,
         )
+        return True
+
+    def _extract_text(self, *, document: Document, file_path: str) -> str:
+        if (document.document_type or "").lower() == DOC_TYPE_PDF:
+            # PyMuPDF reads pages from the file on demand instead of a bytes copy
+            pages = extract_pdf_pages(
+                file_path,
+                min_parallel_pages=PDF_PARALLEL_MIN_PAGES,
+                max_workers=PDF_EXTRACTION_WORKERS,
+            )
+            repeated = find_repeated_lines(pages[:BOILERPLATE_SAMPLE_PAGES])
+            text = "\n".join(strip_repeated_lines(pages, repeated))
+        else:
+            text = "".join(self._iter_text(document=document, file_path=file_path))
+
+        cleaned = text.strip()
+        if not cleaned:
+            raise ValueError("Document text is empty after extraction")
 
-    def _download_bytes(self, document: Document) -> bytes:
-        return download_file(document.storage_url)
+        return cleaned
 
-    def _extract_text(self, *, document: Document, file_bytes: bytes) -> str:
+    def _iter_text(self, *, document: Document, file_path: str) -> Iterator[str]:
+        """Yield the raw extracted text in pieces (pages or file blocks), in order."""
         doc_type = (document.document_type or "").lower()
 
         if doc_type == DOC_TYPE_PDF:
-            pdf_document = fitz.open(stream=file_bytes, filetype="pdf")
-            text_parts: list[str] = []
-            try:
-                for page_num in range(pdf_document.page_count):
-                    page = pdf_document[page_num]
-                    extracted = page.get_text() or ""
-                    if extracted and isinstance(extracted, str):
-                        text_parts.append(extracted)
-            finally:
-                pdf_document.close()
-            text = "\n".join(text_parts)
+            # Same text as _extract_text: pages without their repeated lines, joined by newlines
+            pages = iter_pdf_pages(file_path)
+            sample = list(islice(pages, BOILERPLATE_SAMPLE_PAGES))
+            repeated = find_repeated_lines(sample)
+            for index, page in enumerate(strip_repeated_lines(chain(sample, pages), repeated)):
+                yield "\n" + page if index else page
         elif doc_type in (DOC_TYPE_TXT, DOC_TYPE_MD):
-            text = file_bytes.decode("utf-8", errors="ignore")
+            # newline="" keeps line endings as they are, like decoding the raw bytes
+            with open(file_path, encoding="utf-8", errors="ignore", newline="") as f:
+                while block := f.read(TEXT_READ_BLOCK_SIZE):
+                    yield block
         elif doc_type == DOC_TYPE_HTML:
             parser = _HTMLTextExtractor()
-            parser.feed(file_bytes.decode("utf-8", errors="ignore"))
-            text = parser.get_text()
+            started = False
+            with open(file_path, encoding="utf-8", errors="ignore", newline="") as f:
+                while block := f.read(TEXT_READ_BLOCK_SIZE):
+                    parser.feed(block)
+                    for part in parser.pop_parts():
+                        yield " " + part if started else part
+                        started = True
+            parser.close()
+            for part in parser.pop_parts():
+                yield " " + part if started else part
+                started = True
         else:
             raise ValueError(f"Unsupported document type: {document.document_type}")
 
-        cleaned = text.strip()
-        if not cleaned:
+    def iter_chunks(self, *, document: Document, file_path: str) -> Iterator[str]:
+        """Yield the chunks chunk_text would return for the file's text, as it is extracted."""
+        pieces = strip_text(self._iter_text(document=document, file_path=file_path))
+        empty = True
+        for chunk in split_text_stream(
+            pieces, chunk_size=DEFAULT_CHUNK_SIZE, chunk_overlap=DEFAULT_CHUNK_OVERLAP
+        ):
+            empty = False
+            if chunk and chunk.strip():
+                yield chunk.strip()
+        if empty:
             raise ValueError("Document text is empty after extraction")
 
-        return cleaned
+    def stream_chunks(self, *, document: Document, file_path: str) -> None:
+        """Chunk, deduplicate, embed and store a file window by window, then mark it completed.
+
+        Peak memory is one page or block of text plus STREAMING_WINDOW_CHUNKS chunks and their
+        embeddings, whatever the file size. Windows are stored hidden from search, parked on
+        negative orders so they never collide with the stored chunks, which keep serving searches
+        until one final transaction deletes them and reveals the new ones. Stored chunks are
+        replaced rather than diffed.
+        """
+        # Rows parked by an earlier run that failed part way
+        DocumentChunk.objects.filter(document=document, order__lt=0).delete()
+
+        chunks = self.iter_chunks(document=document, file_path=file_path)
+        duplicates = NearDuplicateFilter()
+        window_size = max(1, STREAMING_WINDOW_CHUNKS)
+        chunk_count = duplicate_count = duplicate_tokens = 0
+        embedding_sum: Optional[np.ndarray] = None
+        while raw_window := list(islice(chunks, window_size)):
+            window, dropped = duplicates.partition(raw_window)
+            duplicate_count += len(dropped)
+            duplicate_tokens += count_tokens(dropped)
+            if not window:
+                continue
+            embeddings = self.embed_chunks(window)
+            DocumentChunk.objects.bulk_copy(
+                DocumentChunk(
+                    document=document,
+                    owner_id=document.owner_id,
+                    is_searchable=False,
+                    order=-1 - (chunk_count + index),
+                    text=chunk,
+                    embedding=embedding,
+                    **quantized_embedding_fields(embedding),
+                )
+                for index, (chunk, embedding) in enumerate(zip(window, embeddings))
+            )
+            window_sum = np.asarray(embeddings, dtype=np.float32).sum(axis=0, dtype=np.float64)
+            embedding_sum = window_sum if embedding_sum is None else embedding_sum + window_sum
+            chunk_count += len(window)
+        if embedding_sum is None:
+            raise ValueError("No text chunks generated from document")
 
-    def _chunk_text(self, text: str) -> list[str]:
+        with transaction.atomic():
+            DocumentChunk.objects.filter(document=document, order__gte=0).delete()
+            DocumentChunk.objects.filter(document=document, order__lt=0).update(
+                order=-1 - F("order"), is_searchable=True
+            )
+            Document.objects.filter(id=document.id).update(
+                status=DOC_STATUS_COMPLETED,
+                pipeline_version=DOCUMENT_PIPELINE_VERSION,
+                chunk_count=chunk_count,
+                duplicate_chunk_count=duplicate_count,
+                duplicate_chunk_tokens=duplicate_tokens,
+                centroid=(embedding_sum / chunk_count).astype(np.float32).tolist(),
+                updated_at=timezone.now(),
+            )
+
+            owner_id = document.owner_id
+            transaction.on_commit(lambda: invalidate_snapshot(owner_id))
+
+        document.status = DOC_STATUS_COMPLETED
+        logger.info(
+            "Document %s streamed into %s chunks (%s near-duplicates dropped)",
+            document.id,
+            chunk_count,
+            duplicate_count,
+        )
+
+    def chunk_text(self, text: str) -> list[str]:
         raw_chunks = self._splitter.split_text(text)
         chunks = []
         for chunk in raw_chunks:
@@ -141,11 +496,36 @@ class DocumentProcessor:
 
         return chunks
 
-    def _generate_metadata(self, chunks: list[str], current_title: str) -> DocumentMetadata:
+    def load_summary_chunks(self, document: Document) -> list[str]:
+        """Load only the stored chunks generate_metadata samples, in sample order."""
+        orders = summary_chunk_orders(document.chunks.count())
+        texts = dict(document.chunks.filter(order__in=orders).values_list("order", "text"))
+        return [texts[order] for order in orders if order in texts]
+
+    def drop_duplicate_chunks(self, document: Document, chunks: list[str]) -> list[str]:
+        """Drop near-duplicates of earlier chunks and record the embedding tokens they save."""
+        kept, dropped = NearDuplicateFilter().partition(chunks)
+        document.duplicate_chunk_count = len(dropped)
+        document.duplicate_chunk_tokens = count_tokens(dropped)
+        Document.objects.filter(id=document.id).update(
+            duplicate_chunk_count=document.duplicate_chunk_count,
+            duplicate_chunk_tokens=document.duplicate_chunk_tokens,
+        )
+        if dropped:
+            logger.info(
+                "Document %s: dropped %s of %s chunks as near-duplicates (%s tokens)",
+                document.id,
+                len(dropped),
+                len(chunks),
+                document.duplicate_chunk_tokens,
+            )
+        return kept
+
+    def generate_metadata(self, chunks: list[str], current_title: str) -> DocumentMetadata:
         """Generate structured metadata (title, description, summary) using LLM with pydantic validation.
 
-        Strategy: Take first chunks (intro), some middle chunks (body), and last chunks (conclusion)
-        to create a representative sample without sending all chunks to the LLM.
+        Only a sample of the chunks (see summary_chunk_orders) is sent to the LLM; a list that is
+        already that sample is used as is.
         """
         if not chunks:
             return DocumentMetadata(
@@ -154,26 +534,7 @@ class DocumentProcessor:
                 summary="No content available for summary.",
             )
 
-        total_chunks = len(chunks)
-        chunks_to_use = min(SUMMARY_CHUNKS_TO_USE, total_chunks)
-
-        # Smart selection strategy
-        if total_chunks <= SUMMARY_CHUNKS_TO_USE:
-            # Use all chunks if we have fewer than the limit
-            selected_chunks = chunks
-        else:
-            # Take chunks from beginning, middle, and end
-            # 40% from start, 30% from middle, 30% from end
-            start_count = max(1, int(chunks_to_use * 0.4))
-            middle_count = max(1, int(chunks_to_use * 0.3))
-            end_count = chunks_to_use - start_count - middle_count
-
-            start_chunks = chunks[:start_count]
-            middle_start = (total_chunks - middle_count) // 2
-            middle_chunks = chunks[middle_start : middle_start + middle_count]
-            end_chunks = chunks[-end_count:] if end_count > 0 else []
-
-            selected_chunks = start_chunks + middle_chunks + end_chunks
+        selected_chunks = [chunks[order] for order in summary_chunk_orders(len(chunks))]
 
         # Combine selected chunks
         combined_text = "\n\n".join(selected_chunks)
@@ -183,111 +544,217 @@ class DocumentProcessor:
         if len(combined_text) > max_chars:
             combined_text = combined_text[:max_chars] + "..."
 
-        # Generate structured metadata using OpenAI with pydantic validation
-        try:
-            # Create a structured output LLM
-            structured_llm = self._llm.with_structured_output(DocumentMetadata)
-
-            system_message = SystemMessage(
-                content=(
-                    "You are a document analysis assistant. Analyze the provided document content "
-                    "and extract structured metadata.\n\n"
-                    "TITLE REQUIREMENTS:\n"
-                    "- Generate a clear, descriptive title (max 200 characters)\n"
-                    "- Capture the main topic or purpose of the document\n"
-                    "- Make it specific and informative\n\n"
-                    "DESCRIPTION REQUIREMENTS:\n"
-                    "- Write 2-3 sentences describing what the document is about\n"
-                    "- Focus on the document's purpose and scope\n"
-                    "- Keep it concise but informative\n\n"
-                    "SUMMARY REQUIREMENTS:\n"
-                    "- Length: 120-150 words maximum\n"
-                    "- Use **bold** for key topics or important terms\n"
-                    "- Use bullet points (•) or numbered lists when listing multiple items\n"
-                    "- Use headers (##) if the summary has distinct sections\n"
-                    "- Keep paragraphs short and scannable\n"
-                    "- Focus on main topics, key findings, and conclusions\n\n"
-                    "Remember: Be accurate, concise, and well-structured."
-                )
-            )
-            user_message = HumanMessage(
-                content=f"Analyze this document and provide title, description, and summary:\n\n{combined_text}"
+        # Generate structured metadata using OpenAI with pydantic validation. Errors propagate so
+        # the caller can retry or mark the metadata as failed; the chunks are already searchable.
+        structured_llm = self._llm.with_structured_output(DocumentMetadata)
+
+        system_message = SystemMessage(
+            content=(
+                "You are a document analysis assistant. Analyze the provided document content "
+                "and extract structured metadata.\n\n"
+                "TITLE REQUIREMENTS:\n"
+                "- Generate a clear, descriptive title (max 200 characters)\n"
+                "- Capture the main topic or purpose of the document\n"
+                "- Make it specific and informative\n\n"
+                "DESCRIPTION REQUIREMENTS:\n"
+                "- Write 2-3 sentences describing what the document is about\n"
+                "- Focus on the document's purpose and scope\n"
+                "- Keep it concise but informative\n\n"
+                "SUMMARY REQUIREMENTS:\n"
+                "- Length: 120-150 words maximum\n"
+                "- Use **bold** for key topics or important terms\n"
+                "- Use bullet points (•) or numbered lists when listing multiple items\n"
+                "- Use headers (##) if the summary has distinct sections\n"
+                "- Keep paragraphs short and scannable\n"
+                "- Focus on main topics, key findings, and conclusions\n\n"
+                "Remember: Be accurate, concise, and well-structured."
             )
+        )
+        user_message = HumanMessage(
+            content=f"Analyze this document and provide title, description, and summary:\n\n{combined_text}"
+        )
 
-            metadata: DocumentMetadata = structured_llm.invoke(  # type: ignore
-                [system_message, user_message],
-                max_tokens=SUMMARY_MAX_TOKENS,
-            )
+        metadata: DocumentMetadata = structured_llm.invoke(  # type: ignore
+            [system_message, user_message],
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
 
-            # Validate that we got reasonable data
-            if not metadata.title or not metadata.title.strip():
-                metadata.title = current_title
-            if not metadata.description or not metadata.description.strip():
-                metadata.description = "Description unavailable."
-            if not metadata.summary or not metadata.summary.strip():
-                metadata.summary = "Summary unavailable."
-
-            return metadata
-
-        except Exception as e:
-            logger.error(f"Failed to generate metadata: {e}", exc_info=True)
-            # Return fallback metadata
-            first_chunk = chunks[0] if chunks else ""
-            preview = first_chunk[:300].strip()
-            return DocumentMetadata(
-                title=current_title,
-                description=f"Metadata generation failed. Document preview: {preview[:100]}...",
-                summary=(
-                    f"Metadata generation failed. Preview: {preview}..."
-                    if preview
-                    else "Summary unavailable."
-                ),
-            )
+        # Validate that we got reasonable data
+        if not metadata.title or not metadata.title.strip():
+            metadata.title = current_title
+        if not metadata.description or not metadata.description.strip():
+            metadata.description = "Description unavailable."
+        if not metadata.summary or not metadata.summary.strip():
+            metadata.summary = "Summary unavailable."
 
-    def _embed_chunks(self, chunks: list[str]) -> list[list[float]]:
-        """Generate embeddings for chunks using LangChain OpenAI embeddings."""
-        embeddings: list[list[float]] = []
-        batch_size = 32
+        return metadata
 
-        for start in range(0, len(chunks), batch_size):
-            batch = chunks[start : start + batch_size]
-            batch_embeddings = self._embeddings_model.embed_documents(batch)
-            embeddings.extend(batch_embeddings)
+    def embed_chunks(self, chunks: list[str]) -> list[list[float]]:
+        """Generate embeddings for chunks, sending up to EMBEDDING_CONCURRENCY batches at once.
 
+        Texts embedded before (by any document) are served from the chunk embedding cache, so
+        only new or changed chunks reach the API; identical texts are embedded once.
+        """
+        cached = chunk_embedding_cache.read(chunks)
+        vectors = {chunk: vector for chunk, vector in zip(chunks, cached) if vector is not None}
+        missing = list(dict.fromkeys(chunk for chunk in chunks if chunk not in vectors))
+
+        fresh: dict[str, list[float]] = {}
+        if missing:
+            fresh = dict(zip(missing, asyncio.run(self._aembed_chunks(missing))))
+            vectors.update(fresh)
+        hits = len(chunks) - sum(vector is None for vector in cached)
+        chunk_embedding_cache.write(fresh, hits=hits, misses=len(chunks) - hits)
+        if hits:
+            logger.info("Embedded %s of %s chunks (%s cached)", len(missing), len(chunks), hits)
+
+        return [vectors[chunk] for chunk in chunks]
+
+    async def _aembed_chunks(self, chunks: list[str]) -> list[list[float]]:
+        batches = pack_embedding_batches(chunks)
+        semaphore = asyncio.Semaphore(max(1, EMBEDDING_CONCURRENCY))
+
+        async with httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max(1, EMBEDDING_CONCURRENCY)),
+            timeout=httpx.Timeout(600.0, connect=5.0),
+        ) as http_client:
+            model = create_async_embeddings_model(http_client)
+
+            async def embed(batch: list[str]) -> list[list[float]]:
+                async with semaphore:
+                    return await _aembed_batch(model, batch)
+
+            tasks = [asyncio.ensure_future(embed(batch)) for batch in batches]
+            try:
+                # gather keeps batch order, so results line up with chunk order
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        embeddings = [embedding for batch_embeddings in results for embedding in batch_embeddings]
         if len(embeddings) != len(chunks):
             raise ValueError("Embedding count does not match chunk count")
 
         return embeddings
 
-    def _persist_chunks(
+    def persist_chunks(
         self,
         *,
         document: Document,
         chunks: list[str],
         embeddings: list[list[float]],
-        metadata: DocumentMetadata,
     ) -> None:
-        with transaction.atomic():
-            DocumentChunk.objects.filter(document=document).delete()
+        """Store the document's chunks and mark it completed.
 
-            DocumentChunk.objects.bulk_create(
-                [
-                    DocumentChunk(
-                        document=document,
-                        order=order,
-                        text=chunk,
-                        embedding=embeddings[order],
-                    )
-                    for order, chunk in enumerate(chunks)
-                ],
-                batch_size=100,
-            )
+        metadata_status is left as it is: pending for new documents and for re-ingests whose
+        content changed (see copy_duplicate), so only those get a new summary.
+        """
+        with transaction.atomic():
+            if document.pipeline_version == DOCUMENT_PIPELINE_VERSION:
+                inserted, moved, deleted = self._diff_chunks(document, chunks, embeddings)
+                logger.info(
+                    "Document %s re-ingested: %s chunks inserted, %s moved, %s deleted",
+                    document.id,
+                    inserted,
+                    moved,
+                    deleted,
+                )
+            else:
+                # Chunks from another pipeline version may have stale embeddings; replace them all
+                DocumentChunk.objects.filter(document=document).delete()
+                self._create_chunks(document, dict(enumerate(chunks)), embeddings)
 
-            # Update document with extracted metadata
             Document.objects.filter(id=document.id).update(
                 status=DOC_STATUS_COMPLETED,
-                title=metadata.title[:200],  # Ensure max length
-                description=metadata.description,
-                summary=metadata.summary,
+                pipeline_version=DOCUMENT_PIPELINE_VERSION,
+                chunk_count=len(chunks),
+                centroid=embedding_centroid(embeddings),
                 updated_at=timezone.now(),
             )
+
+            owner_id = document.owner_id
+            transaction.on_commit(lambda: invalidate_snapshot(owner_id))
+
+    def _create_chunks(
+        self, document: Document, chunks_by_order: dict[int, str], embeddings: list[list[float]]
+    ) -> None:
+        DocumentChunk.objects.bulk_copy(
+            DocumentChunk(
+                document=document,
+                owner_id=document.owner_id,
+                is_searchable=True,
+                order=order,
+                text=chunk,
+                embedding=embeddings[order],
+                **quantized_embedding_fields(embeddings[order]),
+            )
+            for order, chunk in chunks_by_order.items()
+        )
+
+    def _diff_chunks(
+        self, document: Document, chunks: list[str], embeddings: list[list[float]]
+    ) -> tuple[int, int, int]:
+        """Reconcile stored chunks with the new ones by text hash, touching only what changed.
+
+        Unchanged chunks keep their rows (and index entries); moved ones only get a new order.
+        Returns the number of chunks inserted, moved and deleted.
+        """
+        existing: dict[str, list[tuple[Any, int]]] = {}
+        for chunk_id, order, text_hash in (
+            DocumentChunk.objects
+            .filter(document=document)
+            .annotate(text_hash=MD5("text"))
+            .order_by("order")
+            .values_list("id", "order", "text_hash")
+        ):
+            existing.setdefault(text_hash, []).append((chunk_id, order))
+
+        moves: dict[Any, int] = {}
+        new_chunks: dict[int, str] = {}
+        for order, chunk in enumerate(chunks):
+            matches = existing.get(hashlib.md5(chunk.encode("utf-8")).hexdigest())
+            if not matches:
+                new_chunks[order] = chunk
+                continue
+            chunk_id, old_order = matches.pop(0)
+            if old_order != order:
+                moves[chunk_id] = order
+        removed_ids = [chunk_id for rows in existing.values() for chunk_id, _ in rows]
+
+        if removed_ids:
+            DocumentChunk.objects.filter(id__in=removed_ids).delete()
+        if moves:
+            # (document, order) is unique and checked per row: park moved rows on negative
+            # orders first so no intermediate state collides
+            DocumentChunk.objects.bulk_update(
+                [DocumentChunk(id=chunk_id, order=-1 - order) for chunk_id, order in moves.items()],
+                ["order"],
+                batch_size=500,
+            )
+            DocumentChunk.objects.bulk_update(
+                [DocumentChunk(id=chunk_id, order=order) for chunk_id, order in moves.items()],
+                ["order"],
+                batch_size=500,
+            )
+        # A failed document's chunks were hidden from search; the kept ones come back with it
+        DocumentChunk.objects.filter(document=document, is_searchable=False).update(
+            is_searchable=True
+        )
+        if new_chunks:
+            self._create_chunks(document, new_chunks, embeddings)
+
+        return len(new_chunks), len(moves), len(removed_ids)
+
+    def persist_metadata(self, *, document: Document, metadata: DocumentMetadata) -> None:
+        # Only while still pending: the document is editable once completed, and a late or
+        # retried summary must not overwrite a title or description the user changed meanwhile
+        Document.objects.filter(id=document.id, metadata_status=DOC_METADATA_PENDING).update(
+            title=metadata.title[:200],  # Ensure max length
+            description=metadata.description,
+            summary=metadata.summary,
+            metadata_status=DOC_METADATA_COMPLETED,
+            updated_at=timezone.now(),
+        )
@@ -3,15 +3,18 @@ from __future__ import annotations
 import logging
 
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from common.constants import DOC_STATUS_QUEUED
-from document.models import Document
+from document.models import Document, DocumentChunk
+from document.snapshots import invalidate_snapshot
 from document.tasks import process_document_task
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SEARCH_SOURCE_FIELDS = {"status", "owner", "owner_id"}
+
 
 @receiver(post_save, sender=Document)
 def enqueue_document_processing(sender, instance: Document, created: bool, **kwargs) -> None:
@@ -34,3 +37,30 @@ def enqueue_document_processing(sender, instance: Document, created: bool, **kwa
             logger.exception("Failed to enqueue document %s for processing", document_id)
 
     transaction.on_commit(_enqueue_task)
+
+
+@receiver(post_save, sender=Document)
+def sync_chunk_search_fields(sender, instance: Document, created: bool, **kwargs) -> None:
+    stored = instance._stored_search_fields
+    if created:
+        instance._stored_search_fields = instance.chunk_search_fields()
+        return
+
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not CHUNK_SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+
+    # Saves that keep the owner and searchability (most of them) leave the chunks alone
+    instance._stored_search_fields = instance.chunk_search_fields()
+    if stored == instance._stored_search_fields:
+        return
+
+    DocumentChunk.objects.sync_search_fields([instance.id])
+    owner_id = instance.owner_id
+    transaction.on_commit(lambda: invalidate_snapshot(owner_id))
+
+
+@receiver(post_delete, sender=Document)
+def invalidate_owner_snapshot(sender, instance: Document, **kwargs) -> None:
+    owner_id = instance.owner_id
+    transaction.on_commit(lambda: invalidate_snapshot(owner_id))
@@ -0,0 +1,231 @@
+"""Memory-mapped per-user embedding snapshots for in-process exact search.
+
+Each snapshot is a set of .npy files (chunk ids, document index per chunk, L2-normalized float32
+embeddings) plus a manifest.json written last, so readers never see a half-written generation.
+Every process on the host memory-maps the same files read-only, sharing the page cache.
+
+Freshness is tracked with a per-user token in Redis. Any change to the user's library replaces
+the token and deletes the local snapshot files; a manifest built under an older token (on another
+host) is ignored and the snapshot is rebuilt on the next search. If Redis is unavailable,
+snapshots are not used and search falls back to Postgres.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import redis
+
+from common.cache import get_redis_client
+from common.constants import OPENAI_EMBEDDING_DIMENSION
+from config.settings import EMBEDDING_SNAPSHOT_DIR, EMBEDDING_SNAPSHOT_MAX_CHUNKS
+from document.models import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TOKEN_KEY = "embedding-snapshot:token:{owner_id}"
+MANIFEST_NAME = "manifest.json"
+# Snapshots kept open per process; the mapped pages themselves live in the shared page cache
+LOADED_SNAPSHOTS_LIMIT = 128
+
+
+@dataclass(frozen=True)
+class EmbeddingSnapshot:
+    owner_id: str
+    chunk_ids: np.ndarray  # (n,) "U36" chunk UUIDs
+    document_index: np.ndarray  # (n,) int32 positions into document_ids
+    document_ids: tuple[str, ...]
+    embeddings: np.ndarray  # (n, dimensions) float32, L2-normalized
+
+    @cached_property
+    def row_by_chunk_id(self) -> dict[str, int]:
+        return {str(chunk_id): row for row, chunk_id in enumerate(self.chunk_ids)}
+
+
+_loaded: OrderedDict[str, tuple[str, EmbeddingSnapshot]] = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def _owner_dir(owner_id: str) -> Path:
+    return Path(EMBEDDING_SNAPSHOT_DIR) / owner_id
+
+
+def _current_token(owner_id: str) -> str:
+    """Return the library token, creating one if Redis has none (e.g. after a flush)."""
+    client = get_redis_client()
+    key = SNAPSHOT_TOKEN_KEY.format(owner_id=owner_id)
+    token = client.get(key)
+    if token is None:
+        client.set(key, uuid.uuid4().hex, nx=True)
+        token = client.get(key)
+    return token.decode() if isinstance(token, bytes) else str(token)
+
+
+def invalidate_snapshot(owner_id: Any) -> None:
+    """Mark the user's snapshot stale on every host and delete it on this one.
+
+    It is rebuilt by the next search, so users who stop searching leave no files behind here.
+    """
+    owner_id = str(owner_id)
+    try:
+        get_redis_client().set(SNAPSHOT_TOKEN_KEY.format(owner_id=owner_id), uuid.uuid4().hex)
+    except redis.RedisError as e:
+        logger.warning("Embedding snapshot invalidation failed for %s: %s", owner_id, e)
+    try:
+        (_owner_dir(owner_id) / MANIFEST_NAME).unlink(missing_ok=True)
+        _remove_stale_generations(owner_id, keep="")
+        _owner_dir(owner_id).rmdir()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Failed to remove embedding snapshot for %s: %s", owner_id, e)
+
+
+def _read_manifest(owner_id: str) -> Optional[dict[str, Any]]:
+    try:
+        with open(_owner_dir(owner_id) / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    with open(path, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+
+
+def _write_manifest(owner_id: str, manifest: dict[str, Any]) -> None:
+    directory = _owner_dir(owner_id)
+    tmp_path = directory / f".{MANIFEST_NAME}.{uuid.uuid4().hex}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, directory / MANIFEST_NAME)
+
+
+def _remove_stale_generations(owner_id: str, keep: str) -> None:
+    """Delete every generation but keep (all of them when keep is empty)."""
+    # Processes that already mapped an older generation keep their pages after unlink
+    for path in _owner_dir(owner_id).glob("*.npy"):
+        if not keep or not path.name.startswith(f"{keep}."):
+            path.unlink(missing_ok=True)
+
+
+def _build(owner_id: str, token: str) -> dict[str, Any]:
+    directory = _owner_dir(owner_id)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    chunks = DocumentChunk.objects.filter(owner_id=owner_id, is_searchable=True)
+    count = chunks.count()
+    if count > EMBEDDING_SNAPSHOT_MAX_CHUNKS:
+        # Remember that this library is too large so searches skip the count next time
+        manifest: dict[str, Any] = {"token": token, "too_large": True}
+        _write_manifest(owner_id, manifest)
+        _remove_stale_generations(owner_id, keep="")
+        return manifest
+
+    rows = list(
+        chunks.order_by("document_id", "order").values_list("id", "document_id", "embedding")
+    )
+    document_ids: dict[str, int] = {}
+    chunk_ids = np.array([str(chunk_id) for chunk_id, _, _ in rows], dtype="U36")
+    document_index = np.array(
+        [
+            document_ids.setdefault(str(document_id), len(document_ids))
+            for _, document_id, _ in rows
+        ],
+        dtype=np.int32,
+    )
+    embeddings = np.array([embedding for _, _, embedding in rows], dtype=np.float32).reshape(
+        len(rows), OPENAI_EMBEDDING_DIMENSION
+    )
+    if len(rows):
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms == 0, 1, norms)
+
+    generation = uuid.uuid4().hex
+    _save_array(directory / f"{generation}.chunk_ids.npy", chunk_ids)
+    _save_array(directory / f"{generation}.document_index.npy", document_index)
+    _save_array(directory / f"{generation}.embeddings.npy", embeddings)
+
+    manifest = {
+        "token": token,
+        "generation": generation,
+        "document_ids": list(document_ids),
+        "count": len(rows),
+    }
+    _write_manifest(owner_id, manifest)
+    _remove_stale_generations(owner_id, keep=generation)
+    return manifest
+
+
+def _map(owner_id: str, manifest: dict[str, Any]) -> EmbeddingSnapshot:
+    directory = _owner_dir(owner_id)
+    generation = manifest["generation"]
+    return EmbeddingSnapshot(
+        owner_id=owner_id,
+        chunk_ids=np.load(directory / f"{generation}.chunk_ids.npy", mmap_mode="r"),
+        document_index=np.load(directory / f"{generation}.document_index.npy", mmap_mode="r"),
+        document_ids=tuple(manifest["document_ids"]),
+        embeddings=np.load(directory / f"{generation}.embeddings.npy", mmap_mode="r"),
+    )
+
+
+def load_snapshot(owner_id: Any) -> Optional[EmbeddingSnapshot]:
+    """Return the user's current snapshot, building it if stale.
+
+    Returns None when snapshots are disabled, the library exceeds EMBEDDING_SNAPSHOT_MAX_CHUNKS,
+    or the snapshot cannot be validated or read; callers then search Postgres.
+    """
+    if EMBEDDING_SNAPSHOT_MAX_CHUNKS <= 0:
+        return None
+
+    owner_id = str(owner_id)
+    try:
+        token = _current_token(owner_id)
+    except redis.RedisError as e:
+        logger.warning("Embedding snapshot token unavailable for %s: %s", owner_id, e)
+        return None
+
+    try:
+        manifest = _read_manifest(owner_id)
+        if manifest is None or manifest.get("token") != token:
+            manifest = _build(owner_id, token)
+        if manifest.get("too_large"):
+            return None
+
+        generation = manifest["generation"]
+        with _loaded_lock:
+            cached = _loaded.get(owner_id)
+            if cached is not None and cached[0] == generation:
+                _loaded.move_to_end(owner_id)
+                return cached[1]
+
+        try:
+            snapshot = _map(owner_id, manifest)
+        except FileNotFoundError:
+            # A concurrent rebuild removed this generation; build our own
+            manifest = _build(owner_id, token)
+            if manifest.get("too_large"):
+                return None
+            generation = manifest["generation"]
+            snapshot = _map(owner_id, manifest)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Embedding snapshot unavailable for %s: %s", owner_id, e)
+        return None
+
+    with _loaded_lock:
+        _loaded[owner_id] = (generation, snapshot)
+        _loaded.move_to_end(owner_id)
+        while len(_loaded) > LOADED_SNAPSHOTS_LIMIT:
+            _loaded.popitem(last=False)
+    return snapshot
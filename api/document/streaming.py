@@ -0,0 +1,173 @@
+"""Incremental text cleanup and chunking for files too large to hold in memory.
+
+Both consume extracted text as a sequence of pieces (pages, file blocks) and produce exactly what
+the in-memory path produces for the joined text: strip_text matches str.strip, and
+split_text_stream matches RecursiveCharacterTextSplitter.split_text with its default separators.
+
+The recursive splitter cuts the whole text on the first separator it contains, merges the
+pieces into overlapping chunks left to right and recursively splits any piece that is too long
+on its own with the separators after it. A piece is split that way as soon as it reaches the
+chunk size, wherever it ends, and a text without the separator is split with the ones after it
+too, so each level can hand a long open piece to the next level before its end (or the
+separator) arrives. Only about a chunk of text per separator level is held, even for text with
+no paragraph breaks at all, such as PDF pages.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, Iterator, Optional
+
+# RecursiveCharacterTextSplitter's default separators, coarsest first
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def strip_text(pieces: Iterable[str]) -> Iterator[str]:
+    """Yield the pieces of "".join(pieces).strip() without joining them.
+
+    Trailing whitespace is held back until more text follows it, so the end of the last piece
+    is dropped just as str.strip would.
+    """
+    started = False
+    pending = ""
+    for piece in pieces:
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        body = piece.rstrip()
+        if not body:
+            pending += piece
+            continue
+        yield pending + body
+        pending = piece[len(body) :]
+
+
+class _SplitMerger:
+    """TextSplitter._merge_splits fed one split at a time.
+
+    Splits keep their separator (the splitter's keep_separator default), so they are joined
+    with an empty string and the separator adds nothing to the running length.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._current: deque[str] = deque()
+        self._total = 0
+
+    def add(self, split: str) -> list[str]:
+        docs = []
+        length = len(split)
+        if self._total + length > self._chunk_size and self._current:
+            doc = "".join(self._current).strip()
+            if doc:
+                docs.append(doc)
+            # Drop splits from the front until only the overlap is left and the new one fits
+            while self._total > self._chunk_overlap or (
+                self._total + length > self._chunk_size and self._total > 0
+            ):
+                self._total -= len(self._current.popleft())
+        self._current.append(split)
+        self._total += length
+        return docs
+
+    def finish(self) -> list[str]:
+        """Return the last chunk of the current run and start a new one."""
+        doc = "".join(self._current).strip()
+        self._current.clear()
+        self._total = 0
+        return [doc] if doc else []
+
+
+class _SeparatorLevel:
+    """RecursiveCharacterTextSplitter._split_text(text, separators) fed the text in pieces.
+
+    The text is cut before each occurrence of the first separator, as re.split with the
+    separator kept at the start of the next split. Splits shorter than the chunk size are
+    merged; an open split that reaches it is fed to the next level as it arrives.
+    """
+
+    def __init__(self, separators: list[str], chunk_size: int, chunk_overlap: int):
+        self._separators = separators
+        self._separator = separators[0]
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._merger = _SplitMerger(chunk_size, chunk_overlap)
+        self._found = False  # whether the text holds the separator at all
+        self._buffer = ""  # the open split, or while it is delegated its held-back tail
+        self._delegated = 0  # length of the open split already fed to the next level
+        self._next: Optional[_SeparatorLevel] = None
+        self._scan_from = 0  # offset in the open split where the next separator may start
+
+    def feed(self, text: str) -> list[str]:
+        if not self._separator:
+            # Character level: every character is a split of its own
+            docs = []
+            for char in text:
+                docs += self._add_split(char)
+            return docs
+
+        docs = []
+        self._buffer += text
+        while (end := self._buffer.find(self._separator, self._scan_start())) != -1:
+            docs += self._close_split(self._buffer[:end])
+            self._buffer = self._buffer[end:]
+            self._found = True
+            self._delegated = 0
+            self._scan_from = len(self._separator)
+
+        if self._next is None and len(self._buffer) >= self._chunk_size:
+            # Split on the next level wherever it ends, so it can be handed over already
+            docs += self._merger.finish()
+            self._next = _SeparatorLevel(
+                self._separators[1:], self._chunk_size, self._chunk_overlap
+            )
+        if self._next is not None:
+            # Hold back what could be the start of a separator straddling the next piece
+            cut = max(len(self._buffer) - len(self._separator) + 1, 0)
+            docs += self._next.feed(self._buffer[:cut])
+            self._delegated += cut
+            self._buffer = self._buffer[cut:]
+        return docs
+
+    def finish(self) -> list[str]:
+        """Return the chunks left once the whole text has been fed."""
+        if self._separator and not self._found and self._next is None:
+            # The text never held this separator: _split_text moves on to the next one
+            return self._split_finer(self._buffer)
+        docs = self._close_split(self._buffer) if self._separator else []
+        return docs + self._merger.finish()
+
+    def _scan_start(self) -> int:
+        return max(self._scan_from - self._delegated, 0)
+
+    def _close_split(self, rest: str) -> list[str]:
+        if self._next is not None:
+            docs = self._next.feed(rest) + self._next.finish()
+            self._next = None
+            return docs
+        return self._add_split(rest) if rest else []
+
+    def _add_split(self, split: str) -> list[str]:
+        if len(split) < self._chunk_size:
+            return self._merger.add(split)
+        # Too long to merge: it ends the current run and is split on finer separators alone
+        return self._merger.finish() + self._split_finer(split)
+
+    def _split_finer(self, text: str) -> list[str]:
+        if not self._separators[1:]:
+            return [text] if text else []
+        level = _SeparatorLevel(self._separators[1:], self._chunk_size, self._chunk_overlap)
+        return level.feed(text) + level.finish()
+
+
+def split_text_stream(
+    pieces: Iterable[str], *, chunk_size: int, chunk_overlap: int
+) -> Iterator[str]:
+    """Yield the chunks RecursiveCharacterTextSplitter.split_text returns for "".join(pieces)."""
+    level = _SeparatorLevel(SEPARATORS, chunk_size, chunk_overlap)
+    for piece in pieces:
+        yield from level.feed(piece)
+    yield from level.finish()
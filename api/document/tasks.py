@@ -1,23 +1,56 @@
 from __future__ import annotations
 
 import logging
+import uuid
 from datetime import timedelta
+from typing import Optional
 
-from django.db import transaction
+import openai
+import redis
+from botocore.exceptions import BotoCoreError
+from celery import Task, chain, chord
+from celery.exceptions import Ignore
+from django.db import OperationalError, transaction
 from django.utils import timezone
 
 from common.constants import (
+    DOC_METADATA_FAILED,
+    DOC_METADATA_PENDING,
     DOC_STATUS_COMPLETED,
     DOC_STATUS_FAILED,
     DOC_STATUS_PROCESSING,
     DOC_STATUS_QUEUED,
 )
 from config.celery import app
-from document.models import Document
-from document.processing import DocumentProcessor
+from config.settings import PIPELINE_STAGE_MAX_RETRIES, PIPELINE_STUCK_AFTER_SECONDS
+from document.artifacts import (
+    TEXT_ARTIFACT,
+    ArtifactMissing,
+    chunk_batch_artifact,
+    clear_artifacts,
+    load_artifact,
+    load_embeddings,
+    load_json,
+    store_artifact,
+    store_embeddings,
+    store_json,
+)
+from document.models import Document, DocumentChunk
+from document.processing import DocumentProcessor, pack_embedding_batches, summary_chunk_orders
+from document.snapshots import invalidate_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Errors worth retrying a stage for; anything else fails the document straight away
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    redis.RedisError,
+    BotoCoreError,
+    OperationalError,
+)
+
 
 @app.task(bind=True, name="document.process_document")
 def process_document_task(self, document_id: str) -> None:
@@ -41,8 +74,12 @@ def process_document_task(self, document_id: str) -> None:
                 )
                 return
 
-            document.status = DOC_STATUS_PROCESSING
-            document.save(update_fields=["status", "updated_at"])
+            # update() skips the chunk search sync: a reprocessed document's chunks stay
+            # searchable until the new ones are persisted
+            Document.objects.filter(id=document.id).update(
+                status=DOC_STATUS_PROCESSING,
+                updated_at=timezone.now(),
+            )
 
     except Document.DoesNotExist:
         logger.warning("Document %s not found; skipping processing", document_id)
@@ -51,21 +88,186 @@ def process_document_task(self, document_id: str) -> None:
         logger.exception("Failed to prepare document %s for processing", document_id)
         raise
 
+    run_id = uuid.uuid4().hex
+    logger.info("Starting processing run %s for document %s", run_id, document_id)
     try:
-        processor = DocumentProcessor()
-        processor.process(document)
+        chain(
+            extract_document_task.si(document_id, run_id),
+            chunk_document_task.si(document_id, run_id),
+        ).apply_async()
     except Exception:
-        logger.exception("Document %s processing failed", document_id)
+        # Nothing was started, so leave the document for Beat to re-enqueue
         Document.objects.filter(id=document_id).update(
-            status=DOC_STATUS_FAILED,
+            status=DOC_STATUS_QUEUED,
             updated_at=timezone.now(),
         )
         raise
-    logger.info("Document %s processed successfully", document_id)
+
+
+class DocumentStageTask(Task):
+    """Base for pipeline stages: retries transient errors, then fails the document."""
+
+    autoretry_for = TRANSIENT_ERRORS
+    max_retries = PIPELINE_STAGE_MAX_RETRIES
+    retry_backoff = True
+    retry_jitter = True
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo) -> None:
+        document_id = args[0] if args else kwargs.get("document_id")
+        if document_id is None:
+            return
+        if isinstance(exc, ArtifactMissing):
+            # Back to queued: Beat starts a fresh run that recomputes every stage
+            logger.warning("Document %s lost pipeline artifacts; re-queueing: %s", document_id, exc)
+            Document.objects.filter(id=document_id, status=DOC_STATUS_PROCESSING).update(
+                status=DOC_STATUS_QUEUED,
+                updated_at=timezone.now(),
+            )
+            return
+        logger.error("Document %s processing failed in %s: %s", document_id, self.name, exc)
+        _mark_failed(document_id)
+
+
+def _mark_failed(document_id: str) -> None:
+    owner_id = Document.objects.filter(id=document_id).values_list("owner_id", flat=True).first()
+    if owner_id is None:
+        return
+    Document.objects.filter(id=document_id).update(
+        status=DOC_STATUS_FAILED,
+        updated_at=timezone.now(),
+    )
+    DocumentChunk.objects.sync_search_fields([document_id])
+    invalidate_snapshot(owner_id)
+
+
+def _processing_document(document_id: str) -> Optional[Document]:
+    """Return the document if this run should continue with it."""
+    document = Document.objects.filter(id=document_id).first()
+    if document is None or document.status != DOC_STATUS_PROCESSING:
+        logger.info("Document %s is no longer processing; stopping run", document_id)
+        return None
+    return document
+
+
+@app.task(bind=True, base=DocumentStageTask, name="document.pipeline.extract")
+def extract_document_task(self, document_id: str, run_id: str) -> None:
+    document = _processing_document(document_id)
+    if document is None:
+        raise Ignore()
+    text = DocumentProcessor().extract_text(document)
+    if text is None:
+        # Copied from an identical upload or streamed into chunks: skip the rest of the chain
+        logger.info("Document %s processed successfully (run %s, in extract)", document_id, run_id)
+        if document.metadata_status == DOC_METADATA_PENDING:
+            summarize_document_task.delay(document_id)
+        raise Ignore()
+    store_artifact(run_id, TEXT_ARTIFACT, text.encode())
+
+
+@app.task(bind=True, base=DocumentStageTask, name="document.pipeline.chunk")
+def chunk_document_task(self, document_id: str, run_id: str) -> None:
+    """Chunk the extracted text, drop near-duplicates and fan out one embedding subtask per batch."""
+    document = _processing_document(document_id)
+    if document is None:
+        raise Ignore()
+    text = load_artifact(run_id, TEXT_ARTIFACT).decode()
+    processor = DocumentProcessor()
+    chunks = processor.drop_duplicate_chunks(document, processor.chunk_text(text))
+
+    batches = pack_embedding_batches(chunks)
+    for index, batch in enumerate(batches):
+        store_json(run_id, chunk_batch_artifact(index), batch)
+    batch_count = len(batches)
+
+    # Persisting waits for every batch
+    chord(
+        [embed_batch_task.si(document_id, run_id, index) for index in range(batch_count)],
+        persist_document_task.si(document_id, run_id, batch_count),
+    ).apply_async()
+    # The metadata LLM call runs while the batches are embedded, on the sampled chunks
+    if document.metadata_status == DOC_METADATA_PENDING:
+        summary_chunks = [chunks[order] for order in summary_chunk_orders(len(chunks))]
+        summarize_document_task.delay(document_id, summary_chunks)
+
+
+@app.task(bind=True, base=DocumentStageTask, name="document.pipeline.embed_batch")
+def embed_batch_task(self, document_id: str, run_id: str, batch_index: int) -> None:
+    chunks = load_json(run_id, chunk_batch_artifact(batch_index))
+    store_embeddings(run_id, batch_index, DocumentProcessor().embed_chunks(chunks))
+
+
+@app.task(bind=True, base=DocumentStageTask, name="document.pipeline.persist")
+def persist_document_task(self, document_id: str, run_id: str, batch_count: int) -> None:
+    """Store the chunks so the document is searchable."""
+    document = _processing_document(document_id)
+    if document is None:
+        raise Ignore()
+    chunks: list[str] = []
+    embeddings: list[list[float]] = []
+    for index in range(batch_count):
+        chunks.extend(load_json(run_id, chunk_batch_artifact(index)))
+        embeddings.extend(load_embeddings(run_id, index))
+    if len(embeddings) != len(chunks):
+        raise ValueError("Embedding count does not match chunk count")
+
+    DocumentProcessor().persist_chunks(document=document, chunks=chunks, embeddings=embeddings)
+    clear_artifacts(run_id, batch_count)
+    logger.info("Document %s processed successfully (run %s)", document_id, run_id)
+
+
+class DocumentMetadataTask(DocumentStageTask):
+    """Metadata failures leave the document searchable and only fail its metadata."""
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo) -> None:
+        document_id = args[0] if args else kwargs.get("document_id")
+        logger.error("Metadata generation failed for document %s: %s", document_id, exc)
+        Document.objects.filter(id=document_id, metadata_status=DOC_METADATA_PENDING).update(
+            metadata_status=DOC_METADATA_FAILED,
+            updated_at=timezone.now(),
+        )
+
+
+@app.task(bind=True, base=DocumentMetadataTask, name="document.pipeline.summarize")
+def summarize_document_task(
+    self, document_id: str, summary_chunks: Optional[list[str]] = None
+) -> None:
+    """Generate the title, description and summary of a document.
+
+    The chunk stage passes its sampled chunks, so this runs alongside embedding. Copied,
+    streamed and Beat-requeued documents pass none and sample their stored chunks instead.
+    """
+    document = Document.objects.filter(id=document_id, metadata_status=DOC_METADATA_PENDING).first()
+    if document is None:
+        return
+    processor = DocumentProcessor()
+    if summary_chunks is not None:
+        chunks = summary_chunks
+    elif document.status == DOC_STATUS_COMPLETED:
+        chunks = processor.load_summary_chunks(document)
+    else:
+        return
+    processor.persist_metadata(
+        document=document, metadata=processor.generate_metadata(chunks, document.title)
+    )
 
 
 @app.task(bind=True, name="document.enqueue_unprocessed_documents")
 def enqueue_unprocessed_documents(self) -> None:
+    # Runs lost with their worker, or whose persist callback never fired, would leave the
+    # document processing forever; back to queued, the next sweep starts a fresh run
+    stuck_before = timezone.now() - timedelta(seconds=PIPELINE_STUCK_AFTER_SECONDS)
+    stuck_ids = list(
+        Document.objects
+        .filter(status=DOC_STATUS_PROCESSING, updated_at__lte=stuck_before)
+        .order_by("updated_at")
+        .values_list("id", flat=True)[:200]
+    )
+    if stuck_ids:
+        requeued = Document.objects.filter(
+            id__in=stuck_ids, status=DOC_STATUS_PROCESSING, updated_at__lte=stuck_before
+        ).update(status=DOC_STATUS_QUEUED, updated_at=timezone.now())
+        logger.warning("Re-queued %s documents stuck in processing", requeued)
+
     stale_before = timezone.now() - timedelta(minutes=1)
     queued_ids = list(
         Document.objects
@@ -74,10 +276,24 @@ def enqueue_unprocessed_documents(self) -> None:
         .values_list("id", flat=True)[:200]
     )
 
-    if not queued_ids:
-        return
-
     for document_id in queued_ids:
         process_document_task.delay(str(document_id))
+    if queued_ids:
+        logger.info("Enqueued %s queued documents for processing", len(queued_ids))
 
-    logger.info("Enqueued %s queued documents for processing", len(queued_ids))
+    # Metadata tasks lost with their worker; a pending summarize retries far sooner than this
+    metadata_stale_before = timezone.now() - timedelta(minutes=15)
+    pending_metadata_ids = list(
+        Document.objects
+        .filter(
+            status=DOC_STATUS_COMPLETED,
+            metadata_status=DOC_METADATA_PENDING,
+            updated_at__lte=metadata_stale_before,
+        )
+        .order_by("updated_at")
+        .values_list("id", flat=True)[:200]
+    )
+    for document_id in pending_metadata_ids:
+        summarize_document_task.delay(str(document_id))
+    if pending_metadata_ids:
+        logger.info("Enqueued metadata generation for %s documents", len(pending_metadata_ids))
@@ -6,7 +6,7 @@ from typing import Any, Optional, Union, cast
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Count
+from django.db.models.functions import Left
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
@@ -17,6 +17,7 @@ from common.constants import (
     CHUNK_PREVIEW_LENGTH,
     DEFAULT_PAGE_NUMBER,
     DEFAULT_PAGE_SIZE,
+    DOC_METADATA_COMPLETED,
     DOC_SOURCE_UPLOAD,
     DOC_STATUS_COMPLETED,
     DOC_STATUS_FAILED,
@@ -58,11 +59,6 @@ logger = logging.getLogger(__name__)
 
 
 def _serialize_document(document: Document, include_chunks: bool = False) -> dict[str, Any]:
-    # Use annotated chunk_count if available (from list queries), otherwise count
-    chunk_count = getattr(document, "chunk_count", None)
-    if chunk_count is None:
-        chunk_count = document.chunks.count()
-
     data: dict[str, Any] = {
         "id": str(document.id),
         "title": document.title,
@@ -74,20 +70,31 @@ def _serialize_document(document: Document, include_chunks: bool = False) -> dic
         "size_kb": document.size_kb,
         "status": document.status,
         "summary": document.summary,
+        "metadata_status": document.metadata_status,
         "created_at": document.created_at.isoformat(),
         "updated_at": document.updated_at.isoformat(),
-        "chunk_count": chunk_count,
+        "chunk_count": document.chunk_count,
+        "duplicate_chunk_count": document.duplicate_chunk_count,
+        "duplicate_chunk_tokens": document.duplicate_chunk_tokens,
     }
 
     if include_chunks:
-        chunks = document.chunks.all().order_by("order")
+        # Fetch only a preview-sized prefix (plus one char to detect truncation), never embeddings
+        chunks = (
+            document.chunks
+            # Negative orders are rows a streaming run is still writing (see stream_chunks)
+            .filter(order__gte=0)
+            .annotate(preview=Left("text", CHUNK_PREVIEW_LENGTH + 1))
+            .order_by("order")
+            .values("id", "order", "preview")
+        )
         data["chunks"] = [
             {
-                "id": str(chunk.id),
-                "order": chunk.order,
-                "text": chunk.text[:CHUNK_PREVIEW_LENGTH] + "..."
-                if len(chunk.text) > CHUNK_PREVIEW_LENGTH
-                else chunk.text,
+                "id": str(chunk["id"]),
+                "order": chunk["order"],
+                "text": chunk["preview"][:CHUNK_PREVIEW_LENGTH] + "..."
+                if len(chunk["preview"]) > CHUNK_PREVIEW_LENGTH
+                else chunk["preview"],
             }
             for chunk in chunks
         ]
@@ -117,7 +124,7 @@ def list_documents(request: AuthenticatedHttpRequest) -> JsonResponse:
     if search_query:
         documents = documents.filter(title__icontains=search_query)
 
-    documents = documents.annotate(chunk_count=Count("chunks")).order_by("-updated_at")
+    documents = documents.order_by("-updated_at")
 
     paginator: Paginator = Paginator(documents, page_size)
     page_obj = paginator.get_page(page_number)
@@ -406,6 +413,7 @@ def update_document(request: AuthenticatedHttpRequest, document_id: uuid.UUID) -
     except json.JSONDecodeError:
         return JsonResponse({"message": ERROR_INVALID_JSON}, status=status.HTTP_400_BAD_REQUEST)
 
+    update_fields: list[str] = []
     if "title" in data:
         title: str = data["title"]
         if not title or not title.strip():
@@ -418,6 +426,7 @@ def update_document(request: AuthenticatedHttpRequest, document_id: uuid.UUID) -
                 status=status.HTTP_400_BAD_REQUEST,
             )
         document.title = title.strip()
+        update_fields.append("title")
 
     if "description" in data:
         description: str = data["description"]
@@ -428,8 +437,15 @@ def update_document(request: AuthenticatedHttpRequest, document_id: uuid.UUID) -
             )
         else:
             document.description = description.strip()
-
-    document.save()
+            update_fields.append("description")
+
+    if update_fields:
+        # Hand-edited metadata is final: a summary still pending must not overwrite it
+        document.metadata_status = DOC_METADATA_COMPLETED
+        document.metadata_edited = True
+        document.save(
+            update_fields=[*update_fields, "metadata_status", "metadata_edited", "updated_at"]
+        )
 
     return JsonResponse(
         {
@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import StatusView
+from .views import MetricsView, StatusView
 
 urlpatterns = [
     path("", StatusView.as_view(), name="status"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
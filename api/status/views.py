@@ -4,6 +4,9 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from chat.embeddings import query_embedding_cache
+from document.embedding_cache import chunk_embedding_cache
+
 
 class StatusView(APIView):
     """API status endpoint."""
@@ -29,3 +32,21 @@ class StatusView(APIView):
             return True
         except Exception:
             return False
+
+
+class MetricsView(APIView):
+    """Cache counters for scraping."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        return Response(
+            {
+                "data": {
+                    "query_embedding_cache": query_embedding_cache.stats(),
+                    "chunk_embedding_cache": chunk_embedding_cache.stats(),
+                }
+            },
+            status=status.HTTP_200_OK,
+        )
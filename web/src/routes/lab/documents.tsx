@@ -313,6 +313,7 @@ const DocumentCard = ({ document, onUpdate }: DocumentCardProps) => {
                   {' • '}
                   <span>
                     {document.chunk_count} {document.chunk_count === 1 ? 'chunk' : 'chunks'}
+                    {!!document.duplicate_chunk_count && ` (${document.duplicate_chunk_count} deduplicated)`}
                   </span>
                 </>
               )}
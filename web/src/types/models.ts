@@ -20,6 +20,8 @@ export type TUserPersonalization = {
 
 export type TDocumentStatus = 'queued' | 'processing' | 'completed' | 'failed'
 
+export type TDocumentMetadataStatus = 'pending' | 'completed' | 'failed'
+
 export type TDocumentSource = 'upload' | 'url' | 'internal'
 
 export type TDocument = {
@@ -34,7 +36,10 @@ export type TDocument = {
   size_kb: number | null
   status: TDocumentStatus
   summary?: string | null
+  metadata_status?: TDocumentMetadataStatus
   chunk_count?: number
+  duplicate_chunk_count?: number
+  duplicate_chunk_tokens?: number
   created_at?: string
   updated_at?: string
 }